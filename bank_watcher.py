@@ -0,0 +1,26 @@
+from discord.ext import tasks, commands
+import logging
+
+class QuestionBankWatcher(commands.Cog):
+    """Polls the question sheets and hot-reloads any that changed on disk."""
+
+    def __init__(self, bot, loader, interval=30):
+        self.bot = bot
+        self.loader = loader
+        self.watch_task.change_interval(seconds=interval)
+        self.watch_task.start()
+
+    def cog_unload(self):
+        self.watch_task.cancel()
+
+    @tasks.loop(seconds=30)
+    async def watch_task(self):
+        """Checks sheet mtimes and swaps in the changed ones."""
+        try:
+            await self.loader.reload()
+        except Exception as e:
+            logging.error(f"QuestionBankWatcher: reload failed, keeping the current bank: {e}")
+
+    @watch_task.before_loop
+    async def before_watch_task(self):
+        await self.bot.wait_until_ready()
@@ -1,16 +1,37 @@
+import time
+from startup_profile import StartupProfiler
+
+# Created before the other imports so their cost shows up in the startup profile
+startup = StartupProfiler()
+
 import os
+import sys
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 import logging
 import asyncio
 import datetime
+import re
 
 # Service Imports
 from striver_loader import StriverLoader
 from leetcode_service import LeetCodeService
 from scheduler import DailyScheduler
-from code_runner import CodeRunner
+from subscriptions import SubscriptionStore
+from bank_watcher import QuestionBankWatcher
+from catalog_sync import LeetCodeCatalogSync
+from leetcode_catalog import DIFFICULTIES
+from code_runner import CodeRunner, create_backend
+from submission_queue import SubmissionQueue, SubmissionRejected
+from judge import Judge
+from progress_store import ProgressStore
+from output_pager import OutputPager
+from metrics import MetricsServer, registry as metrics
+from resilience import all_breakers
+from shared_state import SharedState, parse_shard_ids
+
+startup.mark("imports")
 
 # Logging Setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,15 +40,108 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 CHANNEL_ID = int(os.getenv('CHANNEL_ID', 0))
+RUNNER_BACKEND = os.getenv('RUNNER_BACKEND', 'piston') # 'piston' or 'local'
+SUBMIT_WORKERS = int(os.getenv('SUBMIT_WORKERS', 3))
+SUBMIT_QUEUE_SIZE = int(os.getenv('SUBMIT_QUEUE_SIZE', 50))
+SUBMIT_MAX_PER_USER = int(os.getenv('SUBMIT_MAX_PER_USER', 2))
+RUN_OUTPUT_MAX_BYTES = int(os.getenv('RUN_OUTPUT_MAX_BYTES', 64 * 1024)) # kept per stream (stdout, stderr)
+OUTPUT_PAGER_TTL = int(os.getenv('OUTPUT_PAGER_TTL', 600)) # seconds long !submit output stays pageable
+BANK_WATCH_INTERVAL = int(os.getenv('BANK_WATCH_INTERVAL', 30)) # seconds, 0 disables
+CATALOG_SYNC_HOURS = float(os.getenv('LEETCODE_CATALOG_SYNC_HOURS', 24)) # 0 disables
+CATALOG_DUMP = os.getenv('LEETCODE_CATALOG_DUMP') # optional problem-list dump imported into an empty catalog
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9108)) # Prometheus /metrics endpoint, 0 disables
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', 0)) # total shards, 0 runs unsharded
+SHARD_IDS = os.getenv('SHARD_IDS') # shards run by this process, e.g. "0-3"; all of them when unset
+STARTUP_PROFILE = os.getenv('STARTUP_PROFILE', '0') == '1' # log a per-phase cold-start report
+STARTUP_BUDGET = float(os.getenv('STARTUP_BUDGET', 0)) or None # seconds; warn when startup takes longer
+PROFILE_ONLY = "--profile-startup" in sys.argv # load everything, report and exit without connecting
+
+if not isinstance(logging.getLevelName(LOG_LEVEL), int):
+    logging.warning("Unknown LOG_LEVEL %r, using INFO.", LOG_LEVEL)
+    LOG_LEVEL = 'INFO'
+logging.getLogger().setLevel(LOG_LEVEL)
 
-if not TOKEN or CHANNEL_ID == 0:
+startup.budget = STARTUP_BUDGET
+
+if not PROFILE_ONLY and (not TOKEN or CHANNEL_ID == 0):
     logging.error("Environment variables DISCORD_TOKEN or CHANNEL_ID are missing.")
     exit(1)
 
+try:
+    shard_ids = parse_shard_ids(SHARD_IDS, SHARD_COUNT) if SHARD_COUNT and SHARD_IDS else None
+except ValueError as e:
+    logging.error("Invalid SHARD_IDS: %s", e)
+    exit(1)
+if shard_ids and METRICS_PORT > 0:
+    METRICS_PORT += shard_ids[0] # one /metrics port per shard-group process
+
 # Bot Setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
+
+class DSABot(commands.AutoShardedBot if SHARD_COUNT else commands.Bot):
+    async def setup_hook(self):
+        """Starts background services once the event loop is running."""
+        startup.mark("login")
+        submission_queue.start()
+        if METRICS_PORT > 0:
+            await metrics_server.start()
+        # Data-backed services load once the gateway is up, so the bot comes online first
+        self.services_task = asyncio.create_task(self.init_services())
+
+    async def init_services(self):
+        """Loads the data-backed services after on_ready, then starts the cogs that use them."""
+        await self.wait_until_ready()
+        startup.mark("gateway")
+        try:
+            # File parsing, SQLite and index builds run in a worker thread, so heartbeats
+            # and the commands waiting on services_ready aren't blocked meanwhile
+            await asyncio.to_thread(load_services)
+        except Exception:
+            logging.exception("Startup: loading services failed, shutting down.")
+            await self.close()
+            return
+        adopt_home_channel()
+        progress.start()
+        await self.add_cog(DailyScheduler(self, subscriptions, build_daily_post, shared_state, daily_post_sent))
+        if BANK_WATCH_INTERVAL > 0:
+            await self.add_cog(QuestionBankWatcher(self, striver_loader, BANK_WATCH_INTERVAL))
+        if CATALOG_SYNC_HOURS > 0:
+            await self.add_cog(LeetCodeCatalogSync(self, leetcode_service, striver_loader, CATALOG_SYNC_HOURS, shared_state))
+        startup.mark("data")
+        services_ready.set()
+        startup.log_report(verbose=STARTUP_PROFILE)
+
+    async def close(self):
+        """Releases pooled service connections before disconnecting."""
+        await submission_queue.close()
+        if progress is not None:
+            await progress.close()
+        await code_runner.close()
+        if leetcode_service is not None:
+            await leetcode_service.close()
+        await metrics_server.close()
+        if shared_state is not None:
+            shared_state.close()
+        await super().close()
+
+    async def invoke(self, ctx):
+        """Runs a command, recording its latency and outcome."""
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            # Command errors are dispatched to handlers rather than raised, so check the flag
+            outcome = "error" if ctx.command_failed else "ok"
+            metrics.observe("dsabot_command_seconds", time.perf_counter() - start,
+                            command=ctx.command.qualified_name, outcome=outcome)
+
+shard_options = {"shard_count": SHARD_COUNT, "shard_ids": shard_ids} if SHARD_COUNT else {}
+bot = DSABot(command_prefix='!', intents=intents, help_command=None, **shard_options)
 
 @bot.command(name='dsahelp', aliases=['commands', 'bothelp'])
 async def help_command(ctx):
@@ -42,10 +156,18 @@ async def help_command(ctx):
     commands_list = [
         ("!daily", "Post today's problem (auto-selects source based on schedule)"),
         ("!leetcode", "Fetch today's official LeetCode Daily Challenge"),
+        ("!leetcode random [tag] [difficulty]", "Random LeetCode problem, e.g. `!leetcode random dp hard` or `!leetcode random Graph`"),
         ("!striver", "Get a random new problem from the Striver DSA sheet"),
         ("!topic <name>", "Get a random Striver problem from a specific topic (e.g. `!topic Arrays`)"),
-        ("!stats", "View repository statistics (Total/Posted/Remaining)"),
-        ("!submit", "Run code snippets (use markdown blocks, e.g. ```python ... ```)"),
+        ("!search <text>", "Find Striver problems by title, typos welcome (e.g. `!search longest comon subsequence`)"),
+        ("!stats [@user]", "View repository statistics, or a member's solves, streak and rank"),
+        ("!leaderboard", "Show this server's top solvers (solve problems with `!judge`)"),
+        ("!subscribe [HH:MM] [timezone] [source]", "Schedule the daily post in this channel (admin, e.g. `!subscribe 09:30 Europe/Berlin striver`)"),
+        ("!unsubscribe", "Stop the scheduled daily post in this channel (admin)"),
+        ("!submit [problem-id]", "Run code snippets (use markdown blocks, e.g. ```python ... ```); add a problem id to record an attempt"),
+        ("!languages", "List the languages and versions `!submit` supports"),
+        ("!judge <problem-id>", "Run your code block against a problem's test cases; passing them all records a solve (e.g. `!judge 1`, `!judge lc:two-sum`)"),
+        ("!metrics", "Show command latency, upstream health and cache hit rates (admin)"),
         ("!dsahelp", "Show this help message (Aliases: !commands)")
     ]
     
@@ -60,160 +182,405 @@ async def help_command(ctx):
     await ctx.send(embed=embed)
 
 # Initialize Services
-striver_loader = StriverLoader()
-leetcode_service = LeetCodeService()
-code_runner = CodeRunner()
+# Sharded processes coordinate scheduled posts, the LeetCode daily cache and catalog syncs here
+shared_state = SharedState(
+    "data/shared_state.db", owner=f"shards-{SHARD_IDS or 'all'}"
+) if SHARD_COUNT else None
+code_runner = CodeRunner(backend=create_backend(RUNNER_BACKEND, max_output_bytes=RUN_OUTPUT_MAX_BYTES))
+output_pager = OutputPager(ttl=OUTPUT_PAGER_TTL)
+subscriptions = SubscriptionStore("data/subscriptions.db")
+submission_queue = SubmissionQueue(
+    code_runner,
+    workers=SUBMIT_WORKERS,
+    max_queue=SUBMIT_QUEUE_SIZE,
+    max_per_user=SUBMIT_MAX_PER_USER
+)
+metrics_server = MetricsServer(metrics, host=METRICS_HOST, port=METRICS_PORT)
+
+# Built by load_services() once the gateway is ready; commands wait on services_ready
+leetcode_service = None
+striver_loader = None
+judge = None
+progress = None
+services_ready = asyncio.Event()
+
+def load_services():
+    """
+    Builds the services that read data files: the LeetCode catalog, the Striver
+    sheets, the judge's test cases and user progress. Nothing here touches the
+    event loop: the bot runs it in a worker thread after on_ready, and offline
+    tools (loadtest.py, --profile-startup) call it directly.
+    """
+    global leetcode_service, striver_loader, judge, progress
+    with startup.step("leetcode catalog"):
+        leetcode_service = LeetCodeService(shared=shared_state)
+        if CATALOG_DUMP and not len(leetcode_service.catalog):
+            leetcode_service.catalog.import_dump(CATALOG_DUMP)
+    with startup.step("striver sheets"):
+        striver_loader = StriverLoader(difficulty_for=leetcode_service.catalog.difficulty_for)
+    with startup.step("judge test cases"):
+        judge = Judge(code_runner)
+    with startup.step("progress"):
+        progress = ProgressStore("data/progress.db")
+
+@bot.before_invoke
+async def wait_for_services(ctx):
+    """Commands sent while the services are still loading wait for them instead of failing."""
+    await services_ready.wait()
+
+def collect_service_metrics():
+    """Gauge samples read at scrape time: queue depth, code cache and circuit breakers."""
+    yield "dsabot_submission_queue_depth", {}, submission_queue.depth
+    cache = code_runner.cache_stats()
+    for key in ("hits", "misses", "coalesced", "evictions", "entries", "bytes"):
+        yield f"dsabot_code_cache_{key}", {}, cache[key]
+    yield "dsabot_code_cache_hit_rate", {}, round(cache["hit_rate"], 4)
+    for key, value in output_pager.stats().items():
+        yield f"dsabot_output_pager_{key}", {}, value
+    for name, breaker in all_breakers().items():
+        stats = breaker.stats()
+        yield "dsabot_circuit_open", {"upstream": name}, int(stats["state"] != "closed")
+        yield "dsabot_circuit_error_rate", {"upstream": name}, round(stats["error_rate"], 4)
+        yield "dsabot_circuit_rejected", {"upstream": name}, stats["rejected"]
+        yield "dsabot_hedged_requests", {"upstream": name}, stats["hedges"]
+
+metrics.add_collector(collect_service_metrics)
+metrics.add_collector(startup.samples)
+
+# Flexible code block regex:
+# 1. ``` : primitive start
+# 2. ([a-zA-Z0-9+\-#]*) : Optional language (allow chars like +, # for c++, c#)
+# 3. \s+ : At least one whitespace (newline usually)
+# 4. (.*?) : The code
+# 5. ``` : End
+CODE_BLOCK_RE = re.compile(r"```([a-zA-Z0-9+\-#]*)\s+(.*?)```", re.DOTALL)
+# Fallback: Maybe they didn't put a language? or formatting is slightly off
+BARE_CODE_BLOCK_RE = re.compile(r"```(.*?)```", re.DOTALL)
+
+def parse_code_block(text):
+    """Returns (language, code) from a markdown code block, or None if there is none."""
+    match = CODE_BLOCK_RE.search(text)
+    if match:
+        # Clean up language string (sometimes has whitespace if regex was loose)
+        return (match.group(1) or "python").strip(), match.group(2)
+
+    match = BARE_CODE_BLOCK_RE.search(text)
+    if match:
+        return "python", match.group(1) # default to python if generic block
+    return None
+
+async def run_queued(ctx, label, language, code, run=None):
+    """
+    Submits a run to the queue and keeps a status message updated
+    (queued -> running). Returns (message, result), or None if rejected.
+    """
+    try:
+        job = submission_queue.submit(ctx.author.id, language, code, run=run)
+    except SubmissionRejected as e:
+        await ctx.send(f"🚦 {e}")
+        return None
+
+    if job.position and not job.started.is_set():
+        msg = await ctx.send(f"Queued {label}, position {job.position}... ⏳")
+        await job.started.wait()
+        await msg.edit(content=f"Running {label}... ⏳")
+    else:
+        msg = await ctx.send(f"Running {label}... ⏳")
+
+    return msg, await job.result
+
+def known_problem_id(problem_id):
+    """Normalizes a problem id ("12", "lc:two-sum") and returns it if it names a real problem, else None."""
+    problem_id = judge.normalize_id(problem_id)
+    if problem_id in striver_loader.index.by_id or judge.get_problem(problem_id):
+        return problem_id
+    if problem_id.startswith("leetcode:") and leetcode_service.catalog.get(problem_id[len("leetcode:"):]):
+        return problem_id
+    return None
 
 @bot.command(name='submit')
 async def submit_command(ctx, *, code_block: str = None):
     """
     Executes code provided in a markdown block.
-    Usage: !submit ```python print('hello') ```
+    Usage: !submit [problem-id] ```python print('hello') ```
     """
+    # Optional problem id before the code block, for progress tracking
+    problem_id = None
+    if code_block and "```" in code_block:
+        prefix, rest = code_block.split("```", 1)
+        if prefix.strip():
+            problem_id = known_problem_id(prefix.strip())
+            code_block = "```" + rest
+
     if not code_block:
         await ctx.send("Please provide code in a markdown block! Example:\n!submit\n\\`\\`\\`python\nprint('Hello')\n\\`\\`\\`")
         return
 
-    # cleaner parsing of the code block
-    import re
-    # Flexible regex:
-    # 1. ``` : primitive start
-    # 2. ([a-zA-Z0-9+\-#]*) : Optional language (allow chars like +, # for c++, c#)
-    # 3. \s+ : At least one whitespace (newline usually)
-    # 4. (.*?) : The code
-    # 5. ``` : End
-    match = re.search(r"```([a-zA-Z0-9+\-#]*)\s+(.*?)```", code_block, re.DOTALL)
-    
-    if not match:
-        # Fallback: Maybe they didn't put a language? or formatting is slightly off
-        # Let's try to just find content between ``` and ```
-        match = re.search(r"```(.*?)```", code_block, re.DOTALL)
-
-    if not match:
+    parsed = parse_code_block(code_block)
+    if not parsed:
          await ctx.send("Could not parse code block. Ensure you use \\`\\`\\`language ... \\`\\`\\` formatting.")
          return
+    language, code = parsed
+
+    queued = await run_queued(ctx, f"{language} code", language, code)
+    if not queued:
+        return
+    msg, result = queued
 
-    language = match.group(1) if len(match.groups()) > 1 else "python"
-    # If the regex was the fallback one, group 1 is the code
-    if len(match.groups()) == 1:
-         code = match.group(1)
-         language = "python" # default to python if generic block
-    else:
-        # standard case
-        language = match.group(1) or "python"
-        code = match.group(2)
-        
-    # Clean up language string (sometimes has whitespace if regex was loose)
-    language = language.strip()
-
-    msg = await ctx.send(f"Running {language} code... ⏳")
-    
-    result = code_runner.execute_code(language, code)
-    
     if "error" in result:
         await msg.edit(content=f"❌ Execution Error: {result['error']}")
         return
 
-    # prepare output
-    output = result.get('output', '')
-    if len(output) > 1900:
-        output = output[:1900] + "... (truncated)"
-    elif not output:
-        output = "(No Output)"
+    title = f"RUN: {result.get('code') == 0 and '✅ Success' or '⚠️ Error'}"
+    color = result.get('code') == 0 and 0x2ecc71 or 0xe74c3c
+    footer = f"Language: {language}"
+    if result.get('cached'):
+        footer += " | ⚡ Cached result"
+    if result.get('code') == 0:
+        # A clean exit proves nothing about correctness: this is an attempt, only !judge awards solves
+        progress.record_run(ctx.guild.id if ctx.guild else None, ctx.author.id, problem_id, solved=False)
+        if problem_id:
+            footer += f" | 📝 Attempt on {problem_id} recorded"
+
+    # stdout and stderr are already capped by the runner; long ones are paged from a buffer
+    stdout, stderr = result.get('stdout') or '', result.get('stderr') or ''
+    if not output_pager.fits_inline(stdout, stderr):
+        token, page_count = output_pager.store(stdout, stderr, title, color, footer)
+        view = output_pager.view(token, page_count, ctx.author.id)
+        await msg.edit(content=None, embed=output_pager.render(token, 0), view=view)
+        view.message = msg
+        return
+
+    embed = discord.Embed(title=title, color=color)
+    embed.add_field(name="Output", value=output_pager.code_block(stdout or "(No Output)"), inline=False)
+    if stderr:
+        embed.add_field(name="Errors", value=output_pager.code_block(stderr), inline=False)
+    embed.set_footer(text=footer)
+
+    await msg.edit(content=None, embed=embed)
+
+@bot.command(name='languages', aliases=['runtimes'])
+async def languages_command(ctx):
+    """Lists the languages and versions !submit can run."""
+    runtimes = await code_runner.runtimes()
+    if not runtimes:
+        await ctx.send("Could not load the list of supported languages right now. :(")
+        return
+
+    lines = [
+        f"{r['language']:<12} {r['version']:<10} {', '.join(r['aliases'][:4])}"
+        for r in sorted(runtimes, key=lambda r: r['language'])
+    ]
+    body = "\n".join(lines)
+    if len(body) > 3900:
+        body = body[:3900].rsplit("\n", 1)[0] + "\n..."
+    embed = discord.Embed(
+        title="🧰 Supported Languages",
+        description=f"```\n{body}\n```",
+        color=0x3498db
+    )
+    embed.set_footer(text="Use the language or any alias in your code block, e.g. ```py")
+    await ctx.send(embed=embed)
+
+@bot.command(name='judge')
+async def judge_command(ctx, problem_id: str = None, *, code_block: str = None):
+    """
+    Runs code against a problem's test cases.
+    Usage: !judge <problem-id> ```python ... ```
+    """
+    if not problem_id or not code_block:
+        await ctx.send(f"Usage: `!judge <problem-id>` followed by a code block. Problems with test cases: {', '.join(judge.problem_ids) or 'none'}")
+        return
+
+    problem = judge.get_problem(problem_id)
+    if not problem:
+        await ctx.send(f"No test cases for problem `{problem_id}`. Problems with test cases: {', '.join(judge.problem_ids) or 'none'}")
+        return
+
+    parsed = parse_code_block(code_block)
+    if not parsed:
+         await ctx.send("Could not parse code block. Ensure you use \\`\\`\\`language ... \\`\\`\\` formatting.")
+         return
+    language, code = parsed
+
+    async def run():
+        return await judge.run(problem_id, language, code)
+
+    queued = await run_queued(ctx, f"{len(problem['cases'])} test cases", language, code, run=run)
+    if not queued:
+        return
+    msg, verdict = queued
+
+    if "error" in verdict:
+        await msg.edit(content=f"❌ Judge Error: ```\n{verdict['error'][:1800]}\n```")
+        return
+
+    cases = verdict['cases']
+    passed = sum(1 for case in cases if case['passed'])
+    first_solve = progress.record_run(
+        ctx.guild.id if ctx.guild else None, ctx.author.id,
+        judge.normalize_id(problem_id), solved=passed == len(cases)
+    )
+    rows = ["#   Result  Time"]
+    for i, case in enumerate(cases, 1):
+        elapsed = f"{case['time'] * 1000:.1f} ms" if case['time'] is not None else "-"
+        rows.append(f"{i:<3} {'PASS' if case['passed'] else 'FAIL':<7} {elapsed}")
 
     embed = discord.Embed(
-        title=f"RUN: {result.get('code') == 0 and '✅ Success' or '⚠️ Error'}",
-        color= result.get('code') == 0 and 0x2ecc71 or 0xe74c3c
+        title=f"JUDGE {problem_id}: {passed}/{len(cases)} passed {'✅' if passed == len(cases) else '❌'}",
+        color=0x2ecc71 if passed == len(cases) else 0xe74c3c
     )
-    embed.add_field(name="Output", value=f"```\n{output}\n```", inline=False)
-    embed.set_footer(text=f"Language: {language}")
+    embed.add_field(name="Results", value="```\n" + "\n".join(rows)[:1000] + "\n```", inline=False)
+
+    failed = next((case for case in cases if not case['passed']), None)
+    if failed:
+        got = failed['error'] or failed['output'] or "(No Output)"
+        detail = f"Input:\n{failed['input'][:300]}\nExpected:\n{failed['expected'][:300]}\nGot:\n{got[:300]}"
+        embed.add_field(name="First Failing Case", value=f"```\n{detail}\n```", inline=False)
+    footer = f"Language: {language} | {'one batched run' if verdict['mode'] == 'batched' else 'cases run in parallel'}"
+    if first_solve:
+        footer += " | 🏅 First solve!"
+    embed.set_footer(text=footer)
 
     await msg.edit(content=None, embed=embed)
 
 
-async def post_daily_problem(channel, source_override=None, topic_filter=None):
+async def build_daily_post(source=None, guild_id=None, topic_filter=None):
     """
     Logic to determine which question to post.
+    Returns (embed, None, post) on success or (None, message, None) when there is
+    nothing to post. `post` describes the content ({"source", "date"} or {"source", "id"});
+    pass it to daily_post_sent once the embed has actually been sent.
     """
-    import datetime
-    day_of_month = datetime.datetime.now().day
-    
-    source = source_override
-    if not source:
+    if not source or source == 'auto':
+        day_of_month = datetime.datetime.now().day
         source = "leetcode" if day_of_month % 2 == 0 else "striver"
-        
-    embed = None
-    
+
     if source == 'leetcode':
-        # LeetCode logic (unchanged)
-        data = leetcode_service.get_daily_challenge()
-        if data:
-            embed = discord.Embed(
-                title=f"🚀 Daily LeetCode Challenge: {data['title']}",
-                url=data['link'],
-                color=0xf0ad4e,
-                timestamp=datetime.datetime.now()
-            )
-            embed.add_field(name="Difficulty", value=data['difficulty'], inline=True)
-            embed.add_field(name="Topic", value=", ".join(data['topics']) or "N/A", inline=True)
-            embed.add_field(name="Date", value=data['date'], inline=False)
-            embed.set_footer(text="Solve it now on LeetCode!")
-        else:
+        data = await leetcode_service.get_daily_challenge()
+        if not data:
             logging.error("Failed to fetch LeetCode data.")
-            await channel.send("Could not fetch LeetCode Daily data today. :(")
-            return
+            return None, "Could not fetch LeetCode Daily data today. :(", None
 
-    elif source == 'striver':
-        # Pass topic_filter if provided
-        data = striver_loader.get_random_question(topic_filter=topic_filter)
-        if data:
-            embed = discord.Embed(
-                title=f"💡 Striver DSA: {data['title']}",
-                url=data['link'],
-                color=0x2ecc71,
-                timestamp=datetime.datetime.now()
-            )
-            embed.add_field(name="Difficulty", value=data['difficulty'], inline=True)
-            embed.add_field(name="Topic", value=data['topic'], inline=True)
-            embed.set_footer(text=f"Striver Sheet | ID: {data['id']}")
-            
-            # Mark as posted
-            striver_loader.mark_as_posted(data['id'])
+        embed = discord.Embed(
+            title=f"🚀 Daily LeetCode Challenge: {data['title']}",
+            url=data['link'],
+            color=0xf0ad4e,
+            timestamp=datetime.datetime.now()
+        )
+        embed.add_field(name="Difficulty", value=data['difficulty'], inline=True)
+        embed.add_field(name="Topic", value=", ".join(data['topics']) or "N/A", inline=True)
+        embed.add_field(name="Date", value=data['date'], inline=False)
+        if data.get('stale'):
+            embed.set_footer(text="Solve it now on LeetCode! (LeetCode unreachable, showing last known challenge)")
         else:
-            if topic_filter:
-                 await channel.send(f"No available questions found for topic: **{topic_filter}** (or all posted).")
-            else:
-                 await channel.send("All Striver questions have been posted! Time to restock.")
-            return
+            embed.set_footer(text="Solve it now on LeetCode!")
+        return embed, None, {"source": "leetcode", "date": data['date']}
+
+    # Striver: pass topic_filter if provided, using this guild's posted history
+    data = striver_loader.get_random_question(topic_filter=topic_filter, guild_id=guild_id)
+    if not data:
+        if topic_filter:
+            suggestions = striver_loader.suggest_topics(topic_filter)
+            hint = f" Did you mean: {', '.join(f'**{t}**' for t in suggestions)}?" if suggestions else ""
+            return None, f"No available questions found for topic: **{topic_filter}** (or all posted).{hint}", None
+        return None, "All Striver questions have been posted! Time to restock.", None
+
+    embed = discord.Embed(
+        title=f"💡 Striver DSA: {data['title']}",
+        url=data['link'],
+        color=0x2ecc71,
+        timestamp=datetime.datetime.now()
+    )
+    embed.add_field(name="Difficulty", value=data['difficulty'], inline=True)
+    embed.add_field(name="Topic", value=data['topic'], inline=True)
+    embed.set_footer(text=f"Striver Sheet | ID: {data['id']}")
+    return embed, None, {"source": "striver", "id": data['id']}
+
+
+def daily_post_sent(post, guild_id=None):
+    """Records a sent daily post; a Striver question only counts as posted once it was delivered."""
+    if post['source'] == 'striver':
+        striver_loader.mark_as_posted(post['id'], guild_id=guild_id)
+
 
+async def post_daily_problem(channel, source_override=None, topic_filter=None):
+    """Builds the daily post for this channel's guild and sends it."""
+    guild = getattr(channel, 'guild', None)
+    guild_id = guild.id if guild else None
+    embed, error, post = await build_daily_post(source_override, guild_id, topic_filter)
     if embed:
         await channel.send(embed=embed)
+        daily_post_sent(post, guild_id)
+    else:
+        await channel.send(error)
 
 
 @bot.event
 async def on_ready():
-    logging.info(f'Logged in as {bot.user} (ID: {bot.user.id})')
+    logging.info('Logged in as %s (ID: %s)', bot.user, bot.user.id)
     logging.info('-------------------------------------------')
-    
-    # Initialize Scheduler
-    # We pass the bot, channel_id, and the callback function for posting
-    # Explicitly force 'leetcode' source for the daily schedule as requested
-    async def scheduled_post_wrapper(channel):
-        await post_daily_problem(channel, source_override='leetcode')
-        
-    await bot.add_cog(DailyScheduler(bot, CHANNEL_ID, scheduled_post_wrapper))
+
+
+def adopt_home_channel():
+    """
+    The CHANNEL_ID channel keeps the original (global) Striver history and is
+    subscribed to the 8:00 IST LeetCode post on first start only, so an
+    !unsubscribe there is not undone; other channels subscribe with !subscribe.
+    """
+    channel = bot.get_channel(CHANNEL_ID)
+    if channel is None and shard_ids:
+        logging.info("Channel %s is not on shards %s; another process posts there.", CHANNEL_ID, SHARD_IDS)
+    elif channel is None:
+        logging.error("Channel %s not found.", CHANNEL_ID)
+    else:
+        striver_loader.home_guild_id = channel.guild.id
+        if subscriptions.seed_home(CHANNEL_ID, channel.guild.id, post_time="08:00", tz="+05:30", source="leetcode"):
+            logging.info("Subscribed home channel %s to the daily post.", CHANNEL_ID)
 
 
 @bot.command(name='daily')
 async def daily(ctx):
     """Manually triggers the daily post."""
-    logging.info(f"Manual trigger by {ctx.author}")
+    logging.info("Manual trigger by %s", ctx.author)
     await post_daily_problem(ctx.channel)
 
 @bot.command(name='leetcode')
-async def leetcode_command(ctx):
-    """Fetches today's LeetCode challenge."""
-    await post_daily_problem(ctx.channel, source_override='leetcode')
+async def leetcode_command(ctx, mode: str = None, *args):
+    """
+    Fetches today's LeetCode challenge, or with `random [tag] [difficulty]`
+    a random problem from the local catalog.
+    """
+    if not mode or mode.lower() != 'random':
+        await post_daily_problem(ctx.channel, source_override='leetcode')
+        return
+
+    if not len(leetcode_service.catalog):
+        await ctx.send("The LeetCode catalog hasn't been synced yet, try again later.")
+        return
+
+    words = list(args)
+    difficulty = None
+    if words and words[-1].capitalize() in DIFFICULTIES:
+        difficulty = words.pop().capitalize()
+    tag = " ".join(words) or None
+
+    data = leetcode_service.get_random_question(tag=tag, difficulty=difficulty)
+    if not data:
+        wanted = " ".join(part for part in (difficulty, tag and f"**{tag}**") if part)
+        await ctx.send(f"No free LeetCode problems found for {wanted}.")
+        return
+
+    embed = discord.Embed(
+        title=f"🎲 LeetCode #{data['id']}: {data['title']}",
+        url=data['link'],
+        color=0xf0ad4e,
+        timestamp=datetime.datetime.now()
+    )
+    embed.add_field(name="Difficulty", value=data['difficulty'], inline=True)
+    embed.add_field(name="Topic", value=", ".join(data['topics']) or "N/A", inline=True)
+    embed.set_footer(text="Random pick from the LeetCode catalog")
+    await ctx.send(embed=embed)
 
 @bot.command(name='striver')
 async def striver_command(ctx):
@@ -225,17 +592,160 @@ async def topic_command(ctx, *, topic_name: str):
     """Get a random Striver problem from a specific topic."""
     await post_daily_problem(ctx.channel, source_override='striver', topic_filter=topic_name)
 
+@bot.command(name='search')
+async def search_command(ctx, *, text: str = None):
+    """Fuzzy-searches Striver problem titles."""
+    if not text:
+        await ctx.send("Usage: `!search <words from the title>` (e.g. `!search longest common subsequence`)")
+        return
+
+    results = striver_loader.search_questions(text, limit=5)
+    if not results:
+        suggestions = striver_loader.suggest_topics(text)
+        hint = f" Try `!topic {suggestions[0]}`." if suggestions else ""
+        await ctx.send(f"No problems found matching **{text}**.{hint}")
+        return
+
+    embed = discord.Embed(title=f"🔎 Results for \"{text[:100]}\"", color=0x3498db)
+    for _, q in results:
+        embed.add_field(
+            name=q['title'][:256],
+            value=f"[Open]({q['link']}) | {q['topic']} | {q['difficulty']} | ID: {q['id']}",
+            inline=False
+        )
+    await ctx.send(embed=embed)
+
 @bot.command(name='stats')
-async def stats_command(ctx):
-    """Shows stats about the question bank."""
-    stats = striver_loader.get_question_stats()
+async def stats_command(ctx, member: discord.Member = None):
+    """Shows stats about the question bank, or a member's progress with `!stats @user`."""
+    guild_id = ctx.guild.id if ctx.guild else None
+    if member is not None:
+        user = progress.user_stats(guild_id, member.id)
+        if user is None:
+            await ctx.send(f"{member.display_name} hasn't run any code here yet.")
+            return
+        rank = f"#{user['rank']} of {user['ranked_users']}" if user['rank'] else "unranked"
+        await ctx.send(
+            f"**Progress: {member.display_name}**\n"
+            f"Solved: {user['solved']} | Runs: {user['runs']}\n"
+            f"Streak: {user['streak']} days (best {user['best_streak']})\n"
+            f"Rank: {rank}"
+        )
+        return
+
+    stats = striver_loader.get_question_stats(guild_id=guild_id)
+    cache = code_runner.cache_stats()
     msg = (
         f"**Repository Stats**\n"
         f"Total Questions: {stats['total']}\n"
         f"Posted: {stats['posted']}\n"
-        f"Remaining: {stats['remaining']}"
+        f"Remaining: {stats['remaining']}\n"
+        f"Cached Code Runs: {cache['hits']} hits / {cache['misses']} misses "
+        f"({cache['coalesced']} coalesced, {cache['entries']} entries)"
     )
     await ctx.send(msg)
 
+@bot.command(name='leaderboard', aliases=['lb'])
+async def leaderboard_command(ctx):
+    """Shows the server's top solvers."""
+    top = progress.leaderboard(ctx.guild.id if ctx.guild else None, limit=10)
+    if not top:
+        await ctx.send("Nobody has solved anything yet. Use `!judge <problem-id>` to get on the board!")
+        return
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    lines = [
+        f"{medals.get(place, f'{place}.')} <@{user_id}>: {solved} solved" + (f" | 🔥 {streak}" if streak else "")
+        for place, (user_id, solved, streak) in enumerate(top, 1)
+    ]
+    embed = discord.Embed(title="🏆 Leaderboard", description="\n".join(lines), color=0xf1c40f)
+    await ctx.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
+@bot.command(name='reload')
+@commands.has_permissions(administrator=True)
+async def reload_command(ctx):
+    """Reloads the question sheets from disk without restarting (admin only)."""
+    try:
+        summary = await striver_loader.reload(force=True)
+    except ValueError as e:
+        await ctx.send(f"❌ Could not parse the question sheets, keeping the current bank: {e}")
+        return
+    await ctx.send(
+        f"**Question Bank Reloaded**\n"
+        f"Total Questions: {summary['total']}\n"
+        f"Added: {summary['added']} | Removed: {summary['removed']} | Changed: {summary['changed']}"
+    )
+
+def format_seconds(value):
+    if value is None:
+        return "-"
+    if value == float("inf"):
+        return ">30s"
+    return f"{value * 1000:.0f}ms" if value < 1 else f"{value:g}s"
+
+@bot.command(name='metrics')
+@commands.has_permissions(administrator=True)
+async def metrics_command(ctx):
+    """Shows latency, upstream health and cache metrics (admin only)."""
+    lines = ["**Commands** (count, p50, p95, errors)"]
+    by_command = {}
+    for labels, histogram in metrics.histograms("dsabot_command_seconds").items():
+        labels = dict(labels)
+        by_command.setdefault(labels["command"], {})[labels["outcome"]] = histogram
+    for command, outcomes in sorted(by_command.items()):
+        ok = outcomes.get("ok")
+        errors = outcomes["error"].count if "error" in outcomes else 0
+        count = (ok.count if ok else 0) + errors
+        lines.append(f"`!{command}`: {count}, {format_seconds(ok and ok.quantile(0.5))}, "
+                     f"{format_seconds(ok and ok.quantile(0.95))}, {errors}")
+
+    lines.append("**Upstreams** (status: count, p95)")
+    upstreams = {}
+    for labels, histogram in metrics.histograms("dsabot_upstream_request_seconds").items():
+        labels = dict(labels)
+        upstreams.setdefault(labels["upstream"], []).append(
+            f"{labels['status']}: {histogram.count}, {format_seconds(histogram.quantile(0.95))}")
+    for name, breaker in sorted(all_breakers().items()):
+        upstreams.setdefault(name, [])
+    for name, statuses in sorted(upstreams.items()):
+        breaker = all_breakers().get(name)
+        state = f" [circuit {breaker.state}]" if breaker else ""
+        lines.append(f"{name}{state}: {' | '.join(sorted(statuses)) or 'no requests yet'}")
+
+    cache = code_runner.cache_stats()
+    daily = {dict(labels)["result"]: value for labels, value in metrics.counters("dsabot_leetcode_daily_cache_total").items()}
+    lines.append("**Queues & Caches**")
+    lines.append(f"Submission queue depth: {submission_queue.depth}")
+    lines.append(f"Code cache hit rate: {cache['hit_rate']:.0%} ({cache['hits']} hits / {cache['misses']} misses)")
+    lines.append(f"LeetCode daily cache: {daily.get('hit', 0)} hits, {daily.get('shared', 0)} from other shards, "
+                 f"{daily.get('refreshed', 0)} refreshes, {daily.get('stale', 0)} stale")
+    await ctx.send("\n".join(lines)[:2000])
+
+@bot.command(name='subscribe')
+@commands.has_permissions(administrator=True)
+async def subscribe_command(ctx, post_time: str = "08:00", tz: str = "+05:30", source: str = "leetcode"):
+    """Schedules the daily post in this channel (admin only)."""
+    try:
+        subscriptions.upsert(ctx.channel.id, ctx.guild.id if ctx.guild else None, post_time, tz, source.lower())
+    except ValueError as e:
+        await ctx.send(f"❌ {e}")
+        return
+    await ctx.send(f"✅ This channel will get the daily **{source.lower()}** post at **{post_time}** ({tz}).")
+
+@bot.command(name='unsubscribe')
+@commands.has_permissions(administrator=True)
+async def unsubscribe_command(ctx):
+    """Stops the scheduled daily post in this channel (admin only)."""
+    if subscriptions.remove(ctx.channel.id):
+        await ctx.send("✅ Daily post unsubscribed for this channel.")
+    else:
+        await ctx.send("This channel has no daily post subscription.")
+
 if __name__ == "__main__":
+    startup.mark("setup")
+    if PROFILE_ONLY:
+        # Offline cold-start check (no gateway): exits non-zero when over STARTUP_BUDGET
+        load_services()
+        startup.mark("data")
+        print(startup.report())
+        sys.exit(1 if startup.over_budget() else 0)
     bot.run(TOKEN)
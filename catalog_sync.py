@@ -0,0 +1,51 @@
+from discord.ext import tasks, commands
+import logging
+
+class LeetCodeCatalogSync(commands.Cog):
+    """
+    Keeps the local LeetCode catalog fresh and re-applies difficulties to the Striver sheets.
+    In a sharded run only the process holding the sync lease talks to LeetCode;
+    the others pick the new rows up from the shared database file.
+    """
+
+    LEASE = "leetcode-catalog-sync"
+
+    def __init__(self, bot, service, loader, hours=24, shared=None):
+        self.bot = bot
+        self.service = service
+        self.loader = loader
+        self.shared = shared # SharedState, or None when this is the only process
+        self.hours = hours
+        self.sync_task.change_interval(hours=hours)
+        self.sync_task.start()
+
+    def cog_unload(self):
+        self.sync_task.cancel()
+
+    @tasks.loop(hours=24)
+    async def sync_task(self):
+        """Pulls new (and, weekly, all) problems; reloads the sheets if anything changed."""
+        # The lease outlives one interval, so the holder keeps renewing it and another
+        # process only takes over once the holder has missed a sync
+        if self.shared is not None and not self.shared.acquire_lease(self.LEASE, self.hours * 3600 * 1.5):
+            if self.service.catalog.refresh_if_changed():
+                await self._reload_sheets()
+            return
+        try:
+            changed = await self.service.sync_catalog()
+        except Exception as e:
+            logging.error(f"LeetCodeCatalogSync: sync failed, keeping the current catalog: {e}")
+            return
+        if changed:
+            await self._reload_sheets()
+
+    async def _reload_sheets(self):
+        """Re-applies catalog difficulties to the sheets; a sheet that doesn't parse is left as it was."""
+        try:
+            await self.loader.reload(force=True)
+        except ValueError as e:
+            logging.error(f"LeetCodeCatalogSync: sheet reload failed, keeping the current bank: {e}")
+
+    @sync_task.before_loop
+    async def before_sync_task(self):
+        await self.bot.wait_until_ready()
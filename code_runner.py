@@ -1,40 +1,161 @@
-import requests
+import asyncio
+import aiohttp
+import hashlib
+import json
 import logging
+import time
 
-class CodeRunner:
+from metrics import registry as metrics
+from resilience import CircuitOpenError, breaker_for
+from result_cache import ResultCache
+
+DEFAULT_MAX_OUTPUT_BYTES = 64 * 1024 # per stream, for every backend
+
+class OutputTooLarge(Exception):
+    """An execution response grew past the backend's byte ceiling while it was being read."""
+
+def cap_text(text, limit):
+    """Cuts `text` to at most `limit` UTF-8 bytes. Returns (text, truncated)."""
+    data = (text or "").encode("utf-8")
+    if len(data) <= limit:
+        return text or "", False
+    return data[:limit].decode("utf-8", "ignore"), True
+
+class PistonBackend:
     """
     Executes code using the Piston API (https://emkc.org/api/v2/piston).
+    Execution responses are read with a byte ceiling, and stdout and stderr are
+    each cut to `max_output_bytes`, so a program printing megabytes can't make
+    the bot buffer them.
     """
     API_URL = "https://emkc.org/api/v2/piston/execute"
+    RUNTIMES_URL = "https://emkc.org/api/v2/piston/runtimes"
+    TIMEOUT = 10 # seconds, per request
+    MAX_CONNECTIONS = 10 # pooled keep-alive connections to Piston
+    KEEPALIVE_TIMEOUT = 60 # seconds an idle connection is kept open
+    RUNTIMES_TTL = 6 * 60 * 60 # seconds the runtime table is trusted
+    RUNTIMES_RETRY = 60 # seconds before retrying a failed runtime fetch
 
-    def __init__(self):
+    def __init__(self, pinned_versions=None, max_output_bytes=DEFAULT_MAX_OUTPUT_BYTES):
+        self.max_output_bytes = max_output_bytes
         self.headers = {
             "Content-Type": "application/json",
             "User-Agent": "LeetCode-Discord-Bot"
         }
+        self._session = None
+        self.pinned_versions = pinned_versions or {} # language -> exact version to use
+        self._runtimes = None # list of {"language", "version", "aliases"}
+        self._aliases = {} # language or alias -> (language, version)
+        self._runtimes_expires_at = 0
+        self._runtimes_task = None
+        self.breaker = breaker_for("piston")
 
-    def execute_code(self, language, code, stdin=""):
+    def _get_session(self):
+        """Returns the shared aiohttp session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.MAX_CONNECTIONS,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        """Closes the pooled HTTP session. Safe to call more than once."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @staticmethod
+    def _version_key(version):
+        return tuple(int(part) if part.isdigit() else 0 for part in version.split("."))
+
+    def _index_runtimes(self, runtimes):
+        """Maps every language name and alias to its newest (or pinned) version."""
+        aliases = {}
+        for runtime in sorted(runtimes, key=lambda r: self._version_key(r["version"]), reverse=True):
+            language = runtime["language"]
+            pinned = self.pinned_versions.get(language)
+            if pinned and runtime["version"] != pinned:
+                continue
+            for name in [language] + runtime.get("aliases", []):
+                aliases.setdefault(name.lower(), (language, runtime["version"]))
+        return aliases
+
+    async def runtimes(self):
         """
-        Sends code to Piston API for execution.
+        Returns the cached runtime table, refreshing it after RUNTIMES_TTL.
+        Concurrent callers share one fetch; a failed refresh keeps the old table
+        and is not retried until RUNTIMES_RETRY has passed.
+        Returns None if the table has never been fetched successfully.
         """
-        # Map common discord language names to Piston language names
-        lang_map = {
-            "py": "python",
-            "python": "python",
-            "js": "javascript",
-            "javascript": "javascript",
-            "cpp": "cpp",
-            "c++": "cpp",
-            "c": "c",
-            "java": "java",
-            "go": "go"
-        }
-        
-        lang = lang_map.get(language.lower(), language.lower())
+        if time.time() >= self._runtimes_expires_at:
+            if self._runtimes_task is None:
+                self._runtimes_task = asyncio.ensure_future(self._fetch_runtimes())
+                self._runtimes_task.add_done_callback(self._clear_runtimes_task)
+            await asyncio.shield(self._runtimes_task)
+        return self._runtimes
+
+    def _clear_runtimes_task(self, task):
+        self._runtimes_task = None
+
+    async def _request_json(self, method, url, payload=None, max_bytes=None):
+        """
+        One HTTP round trip; raises on transport errors and non-2xx responses.
+        With `max_bytes`, the body is read in chunks and OutputTooLarge is raised
+        as soon as it passes that size, before the rest is downloaded.
+        """
+        session = self._get_session()
+        with metrics.upstream("piston") as call:
+            async with session.request(method, url, json=payload) as response:
+                call.status = response.status
+                response.raise_for_status()
+                if max_bytes is None:
+                    return await response.json()
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(65536):
+                    body += chunk
+                    if len(body) > max_bytes:
+                        raise OutputTooLarge(f"response passed {max_bytes} bytes")
+                return json.loads(body)
+
+    async def _fetch_runtimes(self):
+        try:
+            # Idempotent read, so a slow attempt is hedged with a second one
+            runtimes = await self.breaker.call(lambda: self._request_json("GET", self.RUNTIMES_URL), hedge=True)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, CircuitOpenError) as e:
+            logging.error(f"Piston runtimes fetch failed: {e}")
+            self._runtimes_expires_at = time.time() + self.RUNTIMES_RETRY
+            return
+
+        self._runtimes = [
+            {"language": r["language"], "version": r["version"], "aliases": r.get("aliases", [])}
+            for r in runtimes
+        ]
+        self._aliases = self._index_runtimes(self._runtimes)
+        self._runtimes_expires_at = time.time() + self.RUNTIMES_TTL
+        logging.info(f"Piston: cached {len(self._runtimes)} runtimes.")
+
+    async def resolve(self, language):
+        """
+        Resolves a language name or alias to (language, version) locally.
+        Returns None for languages Piston doesn't offer. If the runtime table is
+        unavailable, falls back to letting Piston resolve the latest version.
+        """
+        if await self.runtimes() is None:
+            return language, "*"
+        return self._aliases.get(language.lower())
 
+    async def execute(self, lang, code, stdin="", version="*"):
+        """Sends code to Piston API for execution."""
         payload = {
             "language": lang,
-            "version": "*", # Use latest available
+            "version": version, # Concrete version from the runtime table
             "files": [
                 {
                     "content": code
@@ -43,25 +164,197 @@ class CodeRunner:
             "stdin": stdin
         }
 
+        # Piston repeats stdout and stderr in "output", and JSON escaping can grow them,
+        # so the whole body is allowed a few times the per-stream cap
+        max_body = 4 * self.max_output_bytes + 16 * 1024
+
+        async def post():
+            try:
+                return await self._request_json("POST", self.API_URL, payload, max_bytes=max_body)
+            except OutputTooLarge:
+                return None # the program's fault, not Piston's, so the breaker sees a success
+
         try:
-            response = requests.post(self.API_URL, json=payload, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            result = response.json()
-            logging.info(f"Piston Response: {result}")
-            
+            # Executions are not hedged: a duplicate would double the upstream load
+            result = await self.breaker.call(post)
+            if result is None:
+                return {"error": f"The program printed far more than {self.max_output_bytes // 1024} KiB, so its output was discarded."}
             run_stage = result.get("run", {})
+            stdout, out_cut = cap_text(run_stage.get("stdout"), self.max_output_bytes)
+            stderr, err_cut = cap_text(run_stage.get("stderr"), self.max_output_bytes)
+            # Lazy %-formatting: nothing is built unless DEBUG is enabled
+            logging.debug("piston.execute language=%s version=%s exit=%s signal=%s stdout_bytes=%d stderr_bytes=%d",
+                          lang, version, run_stage.get("code"), run_stage.get("signal"),
+                          len(run_stage.get("stdout") or ""), len(run_stage.get("stderr") or ""))
+            if out_cut or err_cut:
+                stderr += f"\n[output truncated at {self.max_output_bytes} bytes]"
+            output, _ = cap_text(run_stage.get("output"), 2 * self.max_output_bytes)
+            wall_ms = run_stage.get("wall_time") # reported by newer Piston versions only
             return {
-                "stdout": run_stage.get("stdout", ""),
-                "stderr": run_stage.get("stderr", ""),
-                "output": run_stage.get("output", ""), # Combined output
+                "stdout": stdout,
+                "stderr": stderr,
+                "output": output, # Combined output
                 "code": run_stage.get("code", 0), # Exit code
-                "signal": run_stage.get("signal", None)
+                "signal": run_stage.get("signal", None),
+                "truncated": out_cut or err_cut,
+                "time": wall_ms / 1000 if wall_ms is not None else None # run stage only
             }
 
-        except requests.RequestException as e:
+        except CircuitOpenError:
+            return {"error": "The code execution service is having trouble, please try again in a minute."}
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
             logging.error(f"Piston API Error: {e}")
             return {"error": "Failed to verify code execution service."}
 
+def create_backend(name, max_output_bytes=DEFAULT_MAX_OUTPUT_BYTES):
+    """
+    Returns the execution backend for a RUNNER_BACKEND name ("piston" or "local"),
+    keeping at most `max_output_bytes` of each output stream.
+    """
+    name = (name or "piston").lower()
+    if name == "piston":
+        return PistonBackend(max_output_bytes=max_output_bytes)
+    if name == "local":
+        from local_executor import LocalBackend
+        return LocalBackend(max_output_bytes=max_output_bytes)
+    raise ValueError(f"Unknown code runner backend: {name}")
+
+class CodeRunner:
+    """
+    Runs code snippets through a pluggable execution backend (Piston by default,
+    or LocalBackend for sandboxed subprocesses), with a result cache in front.
+    A backend provides `async resolve(language)` -> (language, version) or None,
+    `async runtimes()`, `async execute(lang, code, stdin, version)` returning
+    the result dict below, and `async close()`. A backend that can build a
+    program once and run it per input also provides
+    `async execute_cases(lang, code, inputs, version, parallel, timeout)`.
+    """
+
+    # Map common discord language names to canonical language names
+    LANG_MAP = {
+        "py": "python",
+        "python": "python",
+        "js": "javascript",
+        "javascript": "javascript",
+        "cpp": "cpp",
+        "c++": "cpp",
+        "c": "c",
+        "java": "java",
+        "go": "go"
+    }
+
+    def __init__(self, backend=None, cache_entries=256, cache_bytes=4 * 1024 * 1024, cache_ttl=600):
+        self.backend = backend or PistonBackend()
+        self.cache = ResultCache(max_entries=cache_entries, max_bytes=cache_bytes, ttl=cache_ttl)
+        self._inflight = {} # cache key -> task running the upstream request
+        self.coalesced = 0
+
+    async def close(self):
+        """Releases the backend's resources. Safe to call more than once."""
+        await self.backend.close()
+
+    async def runtimes(self):
+        """Returns the backend's runtime table: [{"language", "version", "aliases"}], or None."""
+        return await self.backend.runtimes()
+
+    @staticmethod
+    def _cache_key(lang, code, stdin):
+        """
+        Content hash of a run. Line endings and trailing blank space are normalized;
+        leading whitespace is kept, since indentation is significant in some languages.
+        """
+        digest = hashlib.sha256()
+        for part in (lang, code.replace("\r\n", "\n").rstrip(), stdin.replace("\r\n", "\n")):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def cache_stats(self):
+        """Hit/miss counters for the result cache, plus requests saved by coalescing."""
+        stats = self.cache.stats()
+        stats["coalesced"] = self.coalesced
+        return stats
+
+    async def execute_code_async(self, language, code, stdin="", cache=True):
+        """
+        Runs code without blocking the event loop.
+        Identical runs are answered from the result cache, and concurrent identical
+        runs share a single upstream request. Cached results carry "cached": True.
+        Pass cache=False for programs that can never repeat (e.g. the judge harness,
+        which embeds a random marker), so they don't push useful entries out.
+        """
+        resolved = await self.backend.resolve(self.LANG_MAP.get(language.lower(), language.lower()))
+        if resolved is None:
+            # Rejected locally, before any request is made
+            return {"error": f"Unsupported language: {language}. Use !languages to see what is available."}
+        lang, version = resolved
+        if not cache:
+            return await self.backend.execute(lang, code, stdin, version)
+        key = self._cache_key(f"{lang}@{version}" if version else lang, code, stdin)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.backend.execute(lang, code, stdin, version))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish_inflight(key, t))
+        else:
+            self.coalesced += 1
+
+        # Shield so one caller being cancelled does not cancel the shared request
+        return dict(await asyncio.shield(task))
+
+    def _finish_inflight(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if "error" in result:
+            return # Upstream failures are not cached
+        size = len(key) + sum(len(result.get(k) or "") for k in ("stdout", "stderr", "output"))
+        self.cache.put(key, result, size)
+
+    async def execute_cases_async(self, language, code, inputs, parallel=3, timeout=None):
+        """
+        Runs one program against several inputs, at most `parallel` at a time. Backends
+        with execute_cases compile once and run each input (stopping runs after `timeout`
+        seconds); otherwise every input is one (cached, coalesced) execute under the
+        backend's own limits. Each result's "time" is the program's own run time, or
+        None if the backend doesn't report it.
+        """
+        resolved = await self.backend.resolve(self.LANG_MAP.get(language.lower(), language.lower()))
+        if resolved is None:
+            return [{"error": f"Unsupported language: {language}. Use !languages to see what is available."}] * len(inputs)
+        lang, version = resolved
+        if hasattr(self.backend, "execute_cases"):
+            return await self.backend.execute_cases(lang, code, inputs, version, parallel, timeout)
+
+        semaphore = asyncio.Semaphore(parallel)
+
+        async def run(stdin):
+            async with semaphore:
+                result = await self.execute_code_async(language, code, stdin)
+            result.setdefault("time", None)
+            return result
+
+        return await asyncio.gather(*(run(stdin) for stdin in inputs))
+
+    def execute_code(self, language, code, stdin=""):
+        """
+        Blocking wrapper around execute_code_async for scripts and quick tests.
+        Must not be called from inside a running event loop (use the async method).
+        """
+        async def run_once():
+            try:
+                return await self.execute_code_async(language, code, stdin)
+            finally:
+                await self.close()
+
+        return asyncio.run(run_once())
+
 if __name__ == "__main__":
     runner = CodeRunner()
     res = runner.execute_code("python", "print('Hello Piston')")
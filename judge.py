@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import secrets
+
+# Replays every test case inside one Python process: each case gets fresh
+# globals, a timer and a SIGALRM time limit. Its input is put on file
+# descriptor 0 (an unlinked temp file), so sys.stdin.buffer, fileno() and
+# open(0) behave as in a normal run; stdout is a text wrapper over a byte
+# buffer, so sys.stdout.buffer works too. Each
+# case's result is printed as JSON after a random marker that user code
+# can't predict, as soon as it is known, so the cases that finished still
+# count if a later one gets the process killed.
+PYTHON_HARNESS = '''
+import io as __io, json as __json, os as __os, signal as __signal, sys as __sys, tempfile as __tempfile
+import time as __time, traceback as __tb
+class __CaseTimeout(BaseException):
+    pass
+__armed = False
+def __on_alarm(signum, frame):
+    if __armed:
+        __signal.setitimer(__signal.ITIMER_REAL, 0.1) # fires again if the submission swallows it
+        raise __CaseTimeout()
+__signal.signal(__signal.SIGALRM, __on_alarm)
+__code = compile({source!r}, "main.py", "exec")
+for __input in {inputs!r}:
+    __fd, __path = __tempfile.mkstemp()
+    __os.unlink(__path)
+    __os.write(__fd, __input.encode("utf-8"))
+    __os.lseek(__fd, 0, __os.SEEK_SET)
+    if __fd != 0: # it is 0 itself if the previous case closed its stdin
+        __os.dup2(__fd, 0)
+        __os.close(__fd)
+    __out = __io.BytesIO()
+    __sys.stdin = open(0, "r", encoding="utf-8", closefd=False)
+    __sys.stdout = __io.TextIOWrapper(__out, encoding="utf-8", write_through=True)
+    __error = None
+    __start = __time.perf_counter()
+    __armed = True
+    __signal.setitimer(__signal.ITIMER_REAL, {timeout!r})
+    try:
+        exec(__code, {{"__name__": "__main__"}})
+    except SystemExit:
+        pass
+    except __CaseTimeout:
+        __error = "Time limit exceeded ({timeout:g}s)"
+    except BaseException as __e:
+        __error = "".join(__tb.format_exception_only(type(__e), __e)).strip()
+    finally:
+        __armed = False
+        __signal.setitimer(__signal.ITIMER_REAL, 0)
+    __elapsed = __time.perf_counter() - __start
+    try:
+        __sys.stdout.flush()
+    except ValueError:
+        pass # the submission closed its stdout
+    __output = __out.getvalue().decode("utf-8", "replace") if not __out.closed else ""
+    __sys.stdin, __sys.stdout = __sys.__stdin__, __sys.__stdout__
+    print({marker!r} + __json.dumps({{"output": __output, "error": __error, "time": __elapsed}}), flush=True)
+'''
+
+def normalize_output(text):
+    """Ignores trailing whitespace on each line and trailing blank lines."""
+    return "\n".join(line.rstrip() for line in text.strip("\n").splitlines()).strip()
+
+class Judge:
+    """
+    Runs a submission against the test cases attached to a problem id.
+    Python submissions are batched into one execution through a generated
+    harness; other languages run their cases concurrently (bounded) through
+    CodeRunner, which coalesces and caches identical runs.
+    """
+
+    CASES_FILE = "data/testcases.json"
+    PARALLEL_CASES = 3
+    CASE_TIMEOUT = 2.0 # seconds of run time per case (compilation and round trips not counted)
+
+    def __init__(self, runner, cases_file=None):
+        self.runner = runner
+        self.cases_file = cases_file or self.CASES_FILE
+        self._problems = self._load_cases()
+
+    def _load_cases(self):
+        if not os.path.exists(self.cases_file):
+            logging.warning(f"Test case file not found: {self.cases_file}")
+            return {}
+        try:
+            with open(self.cases_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError as e:
+            logging.error(f"Error parsing test cases: {e}")
+            return {}
+
+    @staticmethod
+    def normalize_id(problem_id):
+        """Accepts "12", "lc:two-sum" or "leetcode:two-sum"."""
+        problem_id = problem_id.strip()
+        if problem_id.lower().startswith("lc:"):
+            return "leetcode:" + problem_id[3:]
+        return problem_id
+
+    def get_problem(self, problem_id):
+        """Returns {"format": ..., "cases": [...]} for a problem id, or None."""
+        return self._problems.get(self.normalize_id(problem_id))
+
+    @property
+    def problem_ids(self):
+        return list(self._problems)
+
+    async def run(self, problem_id, language, code):
+        """
+        Judges `code` against all cases of `problem_id`.
+        Returns {"mode": "batched"|"parallel", "cases": [{"passed", "time", "expected", "output", "error"}]}
+        or {"error": message}.
+        """
+        problem = self.get_problem(problem_id)
+        if not problem or not problem.get("cases"):
+            return {"error": f"No test cases found for problem `{problem_id}`."}
+        cases = problem["cases"]
+
+        lang = self.runner.LANG_MAP.get(language.lower(), language.lower())
+        if lang == "python":
+            outcomes = await self._run_batched(code, cases)
+            mode = "batched"
+        else:
+            outcomes = await self._run_parallel(lang, code, cases)
+            mode = "parallel"
+        if isinstance(outcomes, dict):
+            return outcomes # execution error
+
+        results = []
+        for case, outcome in zip(cases, outcomes):
+            results.append({
+                "passed": outcome["error"] is None and normalize_output(outcome["output"]) == normalize_output(case["output"]),
+                "time": outcome["time"],
+                "input": case["input"],
+                "expected": case["output"],
+                "output": outcome["output"],
+                "error": outcome["error"]
+            })
+        return {"mode": mode, "cases": results}
+
+    async def _run_batched(self, code, cases):
+        marker = f"@@judge-{secrets.token_hex(8)}@@"
+        harness = PYTHON_HARNESS.format(
+            source=code, inputs=[case["input"] for case in cases], marker=marker, timeout=self.CASE_TIMEOUT
+        )
+        # The marker makes every harness unique, so caching the result would only evict other entries
+        result = await self.runner.execute_code_async("python", harness, cache=False)
+        if "error" in result:
+            return result
+
+        stdout = result.get("stdout", "")
+        if marker not in stdout:
+            # The harness itself failed, e.g. a syntax error in the submission
+            message = (result.get("stderr") or result.get("output") or "Submission did not run.").strip()
+            return {"error": message[-1500:]}
+        outcomes = []
+        for chunk in stdout.split(marker)[1:]:
+            try:
+                outcomes.append(json.loads(chunk))
+            except ValueError:
+                break # cut off by the runner's output cap
+        if len(outcomes) < len(cases):
+            # The process was killed (overall run limit) or its output was capped part-way
+            if result.get("truncated"):
+                error = "Not judged: the submission printed too much output; remove debug prints and try again."
+            else:
+                error = "Not judged: the run was stopped before this case finished."
+            outcomes += [{"output": "", "error": error, "time": 0.0}] * (len(cases) - len(outcomes))
+        return outcomes
+
+    async def _run_parallel(self, lang, code, cases):
+        # The program is built once; "time" is its run time per case (None if the backend can't tell)
+        results = await self.runner.execute_cases_async(
+            lang, code, [case["input"] for case in cases], parallel=self.PARALLEL_CASES,
+            timeout=self.CASE_TIMEOUT + 1 # past the limit, so an overrun is still measured as one
+        )
+        outcomes = []
+        for result in results:
+            if "error" in result:
+                outcomes.append({"output": "", "error": result["error"], "time": None})
+                continue
+            elapsed = result.get("time")
+            failed = result.get("code") != 0
+            error = (result.get("stderr") or f"exit code {result.get('code')}").strip() if failed else None
+            if elapsed is not None and elapsed > self.CASE_TIMEOUT:
+                error = f"Time limit exceeded ({self.CASE_TIMEOUT:g}s)"
+            outcomes.append({"output": result.get("stdout", ""), "error": error, "time": elapsed})
+        return outcomes
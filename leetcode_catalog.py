@@ -0,0 +1,295 @@
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import time
+from array import array
+
+from question_index import normalize_topic
+from search_index import TrigramIndex, acronym, tokenize
+
+DIFFICULTIES = ("Easy", "Medium", "Hard")
+SLUG_RE = re.compile(r"leetcode\.com/problems/([a-z0-9-]+)")
+
+def slug_from_link(link):
+    """Returns the problem slug from a leetcode.com/problems/<slug> link, or None."""
+    match = SLUG_RE.search(link or "")
+    return match.group(1) if match else None
+
+def _parse_difficulty(value):
+    if isinstance(value, dict): # legacy REST dump: {"level": 1|2|3}
+        value = value.get("level")
+    if isinstance(value, int):
+        return DIFFICULTIES[value - 1] if 1 <= value <= 3 else None
+    value = str(value or "").capitalize()
+    return value if value in DIFFICULTIES else None
+
+def normalize_problem(raw):
+    """
+    Maps one problem from the GraphQL problem list, or from the legacy
+    /api/problems/all/ dump ("stat_status_pairs"), to a catalog row dict.
+    Returns None for entries without a slug.
+    """
+    if "stat" in raw: # legacy REST shape, no tags
+        stat = raw["stat"]
+        return {
+            "slug": stat.get("question__title_slug"),
+            "frontend_id": str(stat.get("frontend_question_id", "")),
+            "title": stat.get("question__title", ""),
+            "difficulty": _parse_difficulty(raw.get("difficulty")),
+            "paid_only": bool(raw.get("paid_only")),
+            "tags": []
+        } if stat.get("question__title_slug") else None
+
+    slug = raw.get("titleSlug") or raw.get("slug")
+    if not slug:
+        return None
+    return {
+        "slug": slug,
+        "frontend_id": str(raw.get("frontendQuestionId") or raw.get("questionFrontendId") or ""),
+        "title": raw.get("title", ""),
+        "difficulty": _parse_difficulty(raw.get("difficulty")),
+        "paid_only": bool(raw.get("paidOnly", raw.get("isPaidOnly", False))),
+        "tags": [tag["name"] for tag in raw.get("topicTags") or []]
+    }
+
+class LeetCodeCatalog:
+    """
+    Local mirror of the LeetCode problem list, so random picks and difficulty
+    lookups never need a request. Rows live in SQLite; on load they are packed
+    into an in-memory index: parallel lists per problem, and array buckets of
+    problem positions keyed by (normalized tag, difficulty), so a filtered
+    random pick only touches the matching buckets.
+    """
+
+    PATH = "data/leetcode_catalog.db"
+    PAGE_SIZE = 100
+    INCREMENTAL_OVERLAP = 100 # re-read the newest problems on each incremental sync
+    FULL_SYNC_DAYS = 7 # full pass at most this often, to pick up tag/difficulty edits
+
+    def __init__(self, path=None):
+        self.path = path or self.PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Opened in a worker thread at startup, then used from the event loop only
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS problems (
+                slug TEXT PRIMARY KEY,
+                frontend_id TEXT,
+                title TEXT NOT NULL,
+                difficulty TEXT,
+                paid_only INTEGER NOT NULL DEFAULT 0,
+                tags TEXT NOT NULL DEFAULT '[]',
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self._conn.commit()
+        self._data_version = None
+        self._build_index()
+
+    def _build_index(self):
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        rows = self._conn.execute(
+            "SELECT slug, frontend_id, title, difficulty, paid_only, tags FROM problems "
+            "ORDER BY CAST(frontend_id AS INTEGER)"
+        ).fetchall()
+        slugs, titles, ids, difficulties, paid, tags_of = [], [], [], array("b"), array("b"), []
+        tag_names = {} # normalized tag -> display name
+        buckets = {} # (normalized tag or None, difficulty or None) -> array of positions
+        position_of = {}
+
+        def bucket(key):
+            positions = buckets.get(key)
+            if positions is None:
+                positions = buckets[key] = array("I")
+            return positions
+
+        for position, (slug, frontend_id, title, difficulty, paid_only, tags) in enumerate(rows):
+            tags = json.loads(tags)
+            slugs.append(slug)
+            titles.append(title)
+            ids.append(frontend_id)
+            difficulties.append(DIFFICULTIES.index(difficulty) if difficulty in DIFFICULTIES else -1)
+            paid.append(1 if paid_only else 0)
+            tags_of.append(tuple(tags))
+            position_of[slug] = position
+            if paid_only:
+                continue # never picked at random
+            bucket((None, None)).append(position)
+            if difficulty:
+                bucket((None, difficulty.lower())).append(position)
+            for tag in tags:
+                tag_norm = normalize_topic(tag)
+                tag_names.setdefault(tag_norm, tag)
+                bucket((tag_norm, None)).append(position)
+                if difficulty:
+                    bucket((tag_norm, difficulty.lower())).append(position)
+
+        acronyms = {}
+        for tag in tag_names.values():
+            short = acronym(tag)
+            if short:
+                acronyms.setdefault(short, tag)
+
+        # Swap in one step so readers never see a half-built index
+        (self._slugs, self._titles, self._ids, self._difficulties, self._paid, self._tags,
+         self._position_of, self._buckets, self.tags, self._tag_search, self._tag_acronyms) = (
+            slugs, titles, ids, difficulties, paid, tags_of, position_of, buckets, tag_names,
+            TrigramIndex((name, name) for name in tag_names.values()), acronyms
+        )
+
+    def refresh_if_changed(self):
+        """
+        Rebuilds the index if another bot process (a sharded run) synced the
+        catalog since it was built. Returns True if it was rebuilt.
+        """
+        if self._conn.execute("PRAGMA data_version").fetchone()[0] == self._data_version:
+            return False
+        self._build_index()
+        return True
+
+    def __len__(self):
+        return len(self._slugs)
+
+    def _problem(self, position):
+        difficulty = self._difficulties[position]
+        slug = self._slugs[position]
+        return {
+            "id": self._ids[position],
+            "slug": slug,
+            "title": self._titles[position],
+            "difficulty": DIFFICULTIES[difficulty] if difficulty >= 0 else "Unknown",
+            "topics": list(self._tags[position]),
+            "paid_only": bool(self._paid[position]),
+            "link": f"https://leetcode.com/problems/{slug}/"
+        }
+
+    def get(self, slug):
+        """Returns the problem dict for a slug, or None."""
+        position = self._position_of.get(slug)
+        return None if position is None else self._problem(position)
+
+    def difficulty_for(self, link):
+        """Difficulty for a leetcode.com problem link, or None if it isn't in the catalog."""
+        position = self._position_of.get(slug_from_link(link))
+        if position is None or self._difficulties[position] < 0:
+            return None
+        return DIFFICULTIES[self._difficulties[position]]
+
+    def resolve_tag(self, text):
+        """Maps a tag filter (exact, abbreviation like "dp", or typo) to a tag name, or None."""
+        tag_norm = normalize_topic(text)
+        if tag_norm in self.tags:
+            return self.tags[tag_norm]
+        short = "".join(tokenize(text))
+        if short in self._tag_acronyms:
+            return self._tag_acronyms[short]
+        matches = self._tag_search.search(text, limit=1, min_score=0.5)
+        return matches[0][1] if matches else None
+
+    def random_question(self, tag=None, difficulty=None, rng=random):
+        """Returns a random free problem, optionally filtered by tag and difficulty, or None."""
+        tag_norm = None
+        if tag:
+            name = self.resolve_tag(tag)
+            if name is None:
+                return None
+            tag_norm = normalize_topic(name)
+        positions = self._buckets.get((tag_norm, difficulty.lower() if difficulty else None))
+        if not positions:
+            return None
+        return self._problem(positions[rng.randrange(len(positions))])
+
+    def upsert(self, problems, rebuild=True):
+        """Writes normalized problem dicts and rebuilds the index. Returns the number of rows changed."""
+        now = time.time()
+        rows = [
+            (p["slug"], p["frontend_id"], p["title"], p["difficulty"], int(p["paid_only"]), json.dumps(p["tags"]), now)
+            for p in problems if p
+        ]
+        with self._conn:
+            before = self._conn.total_changes
+            # Only rewrite rows whose content changed, so updated_at marks real edits
+            self._conn.executemany("""
+                INSERT INTO problems (slug, frontend_id, title, difficulty, paid_only, tags, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(slug) DO UPDATE SET
+                    frontend_id = excluded.frontend_id, title = excluded.title,
+                    difficulty = excluded.difficulty, paid_only = excluded.paid_only,
+                    tags = CASE WHEN excluded.tags = '[]' THEN problems.tags ELSE excluded.tags END,
+                    updated_at = excluded.updated_at
+                WHERE (problems.frontend_id, problems.title, problems.difficulty, problems.paid_only, problems.tags)
+                    IS NOT (excluded.frontend_id, excluded.title, excluded.difficulty, excluded.paid_only,
+                            CASE WHEN excluded.tags = '[]' THEN problems.tags ELSE excluded.tags END)
+            """, rows)
+            changed = self._conn.total_changes - before
+        if changed and rebuild:
+            self._build_index()
+        return changed
+
+    def import_dump(self, path):
+        """
+        Imports a local dump: a JSON list of GraphQL problems, a saved GraphQL
+        problem-list response, or the legacy /api/problems/all/ response.
+        Returns the number of rows changed.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            if "stat_status_pairs" in data:
+                data = data["stat_status_pairs"]
+            else:
+                data = data.get("data", data).get("problemsetQuestionList", {}).get("questions", [])
+        changed = self.upsert(normalize_problem(raw) for raw in data)
+        logging.info(f"LeetCodeCatalog: imported {path} ({changed} rows changed, {len(self)} problems).")
+        return changed
+
+    async def sync(self, fetch_page, full=None):
+        """
+        Pages through the problem list with `fetch_page(skip, limit)` (a coroutine
+        returning (total, raw problems)). An incremental sync only reads the
+        newest problems; a full pass runs when the catalog is empty or the last
+        one is older than FULL_SYNC_DAYS. Returns the number of rows changed.
+        """
+        last_full = float(self.get_meta("last_full_sync", 0))
+        if full is None:
+            full = not len(self) or time.time() - last_full > self.FULL_SYNC_DAYS * 86400
+
+        skip = 0 if full else max(0, len(self) - self.INCREMENTAL_OVERLAP)
+        changed, total = 0, None
+        while total is None or skip < total:
+            total, page = await fetch_page(skip, self.PAGE_SIZE)
+            if not page:
+                break
+            changed += self.upsert((normalize_problem(raw) for raw in page), rebuild=False)
+            skip += len(page)
+        if changed:
+            self._build_index()
+
+        now = str(time.time())
+        self.set_meta("last_sync", now)
+        if full:
+            self.set_meta("last_full_sync", now)
+        logging.info(f"LeetCodeCatalog: {'full' if full else 'incremental'} sync done, "
+                     f"{changed} rows changed, {len(self)} problems.")
+        return changed
+
+    def get_meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        self._conn.close()
@@ -1,47 +1,217 @@
-import requests
+import asyncio
+import aiohttp
+import json
 import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from leetcode_catalog import LeetCodeCatalog
+from metrics import registry as metrics
+from resilience import CircuitOpenError, breaker_for
 
 class LeetCodeService:
     BASE_URL = "https://leetcode.com/graphql"
-    
-    def __init__(self):
-        self.headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    CACHE_FILE = "data/leetcode_daily_cache.json"
+    TIMEOUT = 10 # seconds, per request
+    ROLLOVER_RETRY = 300 # seconds to wait before re-checking when LeetCode hasn't rolled over yet
+    SHARED_KEY = "leetcode-daily" # daily challenge in the shared store (sharded runs)
+    REFRESH_LEASE = "leetcode-daily-refresh"
+    SHARED_WAIT = 15 # seconds to wait for another process's refresh before fetching ourselves
+
+    DAILY_QUERY = """
+    query questionOfToday {
+        activeDailyCodingChallengeQuestion {
+            date
+            link
+            question {
+                questionId
+                title
+                titleSlug
+                difficulty
+                topicTags {
+                    name
+                }
+            }
         }
+    }
+    """
 
-    def get_daily_challenge(self):
-        """Fetches the active daily coding challenge from LeetCode."""
-        query = """
-        query questionOfToday {
-            activeDailyCodingChallengeQuestion {
-                date
-                link
-                question {
-                    questionId
-                    title
-                    titleSlug
-                    difficulty
-                    topicTags {
-                        name
-                    }
+    PROBLEM_LIST_QUERY = """
+    query problemsetQuestionList($categorySlug: String, $limit: Int, $skip: Int, $filters: QuestionListFilterInput) {
+        problemsetQuestionList: questionList(categorySlug: $categorySlug, limit: $limit, skip: $skip, filters: $filters) {
+            total: totalNum
+            questions: data {
+                frontendQuestionId: questionFrontendId
+                title
+                titleSlug
+                difficulty
+                paidOnly: isPaidOnly
+                topicTags {
+                    name
                 }
             }
         }
+    }
+    """
+
+    def __init__(self, catalog_path=None, shared=None):
+        self.headers = {
+            "Content-Type": "application/json",
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        }
+        self._session = None
+        self._daily = None # parsed challenge dict
+        self._daily_expires_at = 0 # unix timestamp (UTC based)
+        self._refresh_task = None
+        self.breaker = breaker_for("leetcode")
+        self.catalog = LeetCodeCatalog(catalog_path)
+        self.shared = shared # SharedState, or None when this is the only process
+        self._load_cache()
+
+    def _get_session(self):
+        """Returns the shared aiohttp session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        """Closes the HTTP session. Safe to call more than once."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @staticmethod
+    def _next_utc_midnight(now):
+        tomorrow = (now + timedelta(days=1)).date()
+        return datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=timezone.utc).timestamp()
+
+    def _load_cache(self):
+        """Restores the last fetched challenge so a restart doesn't force a refetch."""
+        if not os.path.exists(self.CACHE_FILE):
+            return
+        try:
+            with open(self.CACHE_FILE, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            self._daily = cached["challenge"]
+            self._daily_expires_at = cached["expires_at"]
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning("Ignoring unreadable LeetCode cache file: %s", e)
+
+    def _save_cache(self):
+        """Writes the cache atomically (temp file + rename)."""
+        tmp_path = f"{self.CACHE_FILE}.{os.getpid()}.tmp" # per process, shards may save at once
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"challenge": self._daily, "expires_at": self._daily_expires_at}, f)
+            os.replace(tmp_path, self.CACHE_FILE)
+        except OSError as e:
+            logging.warning("Could not persist LeetCode cache: %s", e)
+
+    async def get_daily_challenge(self):
         """
-        
-        payload = {"query": query}
-        
+        Returns the active daily coding challenge from LeetCode.
+        The result is cached until the next UTC midnight (LeetCode's rollover) and
+        concurrent callers share one in-flight fetch. In a sharded run the cache is
+        shared through the SharedState store, so only one process fetches per day.
+        If a refresh fails, the last known challenge is returned with "stale": True.
+        """
+        if self._daily is not None and time.time() < self._daily_expires_at:
+            metrics.inc("dsabot_leetcode_daily_cache_total", result="hit")
+            return dict(self._daily)
+        if self._adopt_shared():
+            metrics.inc("dsabot_leetcode_daily_cache_total", result="shared")
+            return dict(self._daily)
+
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.ensure_future(self._refresh_daily())
+            self._refresh_task.add_done_callback(self._clear_refresh_task)
+
+        # Shield so one caller being cancelled does not cancel the shared fetch
+        challenge = await asyncio.shield(self._refresh_task)
+        if challenge is not None:
+            metrics.inc("dsabot_leetcode_daily_cache_total", result="refreshed")
+            return dict(challenge)
+
+        metrics.inc("dsabot_leetcode_daily_cache_total", result="stale" if self._daily is not None else "miss")
+        if self._daily is not None:
+            logging.warning("Serving stale LeetCode daily challenge from %s.", self._daily.get('date'))
+            return dict(self._daily, stale=True)
+        return None
+
+    def _clear_refresh_task(self, task):
+        self._refresh_task = None
+
+    def _adopt_shared(self):
+        """Takes over a challenge another process stored in the shared cache. Returns True if there was one."""
+        if self.shared is None:
+            return False
+        challenge, expires_at = self.shared.get(self.SHARED_KEY)
+        if challenge is None:
+            return False
+        self._daily = challenge
+        self._daily_expires_at = expires_at
+        return True
+
+    async def _refresh_daily(self):
+        if self.shared is not None and not self.shared.acquire_lease(self.REFRESH_LEASE, self.SHARED_WAIT * 2):
+            # Another shard is fetching: wait for its result rather than sending a second request
+            deadline = time.monotonic() + self.SHARED_WAIT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.5)
+                if self._adopt_shared():
+                    return self._daily
+            logging.warning("LeetCode daily: no shared result in time, fetching it here.")
         try:
-            response = requests.post(self.BASE_URL, json=payload, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
+            return await self._refresh_daily_from_leetcode()
+        finally:
+            if self.shared is not None:
+                self.shared.release_lease(self.REFRESH_LEASE)
+
+    async def _refresh_daily_from_leetcode(self):
+        challenge = await self._fetch_daily_challenge()
+        if challenge is None:
+            return None
+
+        now = datetime.now(timezone.utc)
+        if challenge.get("date") == now.date().isoformat():
+            expires_at = self._next_utc_midnight(now)
+        else:
+            # LeetCode is still serving yesterday's problem; check again shortly
+            expires_at = now.timestamp() + self.ROLLOVER_RETRY
+
+        self._daily = challenge
+        self._daily_expires_at = expires_at
+        self._save_cache()
+        if self.shared is not None:
+            self.shared.set(self.SHARED_KEY, challenge, expires_at)
+        return challenge
+
+    async def _post_graphql(self, payload):
+        """One GraphQL round trip; raises on transport errors and non-2xx responses."""
+        session = self._get_session()
+        with metrics.upstream("leetcode") as call:
+            async with session.post(self.BASE_URL, json=payload) as response:
+                call.status = response.status
+                response.raise_for_status()
+                return await response.json()
+
+    async def _fetch_daily_challenge(self):
+        """Fetches the active daily coding challenge from LeetCode."""
+        payload = {"query": self.DAILY_QUERY}
+
+        try:
+            # Idempotent read, so a slow attempt is hedged with a second one
+            data = await self.breaker.call(lambda: self._post_graphql(payload), hedge=True)
+
             challenge = data.get("data", {}).get("activeDailyCodingChallengeQuestion", {})
             if not challenge:
                 logging.error("No active daily challenge found in response.")
                 return None
-                
+
             question = challenge.get("question", {})
             return {
                 "date": challenge.get("date"),
@@ -52,15 +222,45 @@ class LeetCodeService:
                 "slug": question.get("titleSlug"),
                 "id": question.get("questionId")
             }
-            
-        except requests.RequestException as e:
-            logging.error(f"Error fetching LeetCode daily challenge: {e}")
+
+        except CircuitOpenError as e:
+            logging.warning("Skipping LeetCode fetch: %s", e)
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logging.error("Error fetching LeetCode daily challenge: %s", e)
             return None
 
+    def get_random_question(self, tag=None, difficulty=None):
+        """Random free problem from the local catalog (no network), or None."""
+        self.catalog.refresh_if_changed()
+        return self.catalog.random_question(tag=tag, difficulty=difficulty)
+
+    async def _fetch_problem_page(self, skip, limit):
+        """One page of the problem list as (total, raw problems). Raises on failure."""
+        payload = {
+            "query": self.PROBLEM_LIST_QUERY,
+            "variables": {"categorySlug": "", "skip": skip, "limit": limit, "filters": {}}
+        }
+        data = await self.breaker.call(lambda: self._post_graphql(payload))
+        problem_list = (data.get("data") or {}).get("problemsetQuestionList")
+        if not problem_list:
+            raise ValueError(f"Unexpected problem list response: {str(data)[:200]}")
+        return problem_list["total"], problem_list["questions"]
+
+    async def sync_catalog(self, full=None):
+        """Refreshes the local catalog from LeetCode (incrementally unless a full pass is due)."""
+        return await self.catalog.sync(self._fetch_problem_page, full=full)
+
 if __name__ == "__main__":
     # Test the service
-    service = LeetCodeService()
-    daily = service.get_daily_challenge()
+    async def main():
+        service = LeetCodeService()
+        try:
+            return await service.get_daily_challenge()
+        finally:
+            await service.close()
+
+    daily = asyncio.run(main())
     if daily:
         print("Fetched Daily Challenge:")
         print(daily)
@@ -0,0 +1,368 @@
+"""
+Offline load test for the bot's command handlers.
+
+Runs the real handlers from bot.py (submit_command, post_daily_problem,
+stats_command, topic_command) against fake Discord contexts, with LeetCode
+and Piston replaced by local stub servers that inject latency and failures.
+Everything is written to a temporary working directory, so the real posted
+history and caches are never touched.
+
+    python loadtest.py --requests 5000 --concurrency 1000 --latency 0.05 --failure-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = ("submit", "daily", "stats", "topic")
+
+class StubUpstreams:
+    """Local GraphQL + Piston endpoints with configurable latency, jitter and error rate."""
+
+    def __init__(self, latency, jitter, failure_rate, seed):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = {"graphql": 0, "execute": 0, "runtimes": 0}
+        self._runner = None
+        self.base_url = None
+
+    async def _delay_or_fail(self, name):
+        self.requests[name] += 1
+        await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+        if self.rng.random() < self.failure_rate:
+            return web.Response(status=503, text="injected failure")
+        return None
+
+    async def graphql(self, request):
+        failed = await self._delay_or_fail("graphql")
+        if failed:
+            return failed
+        today = datetime.now(timezone.utc).date().isoformat()
+        return web.json_response({"data": {"activeDailyCodingChallengeQuestion": {
+            "date": today,
+            "link": "/problems/two-sum/",
+            "question": {"questionId": "1", "title": "Two Sum", "titleSlug": "two-sum",
+                         "difficulty": "Easy", "topicTags": [{"name": "Array"}, {"name": "Hash Table"}]}
+        }}})
+
+    async def execute(self, request):
+        failed = await self._delay_or_fail("execute")
+        if failed:
+            return failed
+        payload = await request.json()
+        stdout = f"ran {len(payload['files'][0]['content'])} bytes\n"
+        return web.json_response({"language": payload["language"], "version": payload["version"],
+                                  "run": {"stdout": stdout, "stderr": "", "output": stdout, "code": 0, "signal": None}})
+
+    async def runtimes(self, request):
+        failed = await self._delay_or_fail("runtimes")
+        if failed:
+            return failed
+        return web.json_response([
+            {"language": "python", "version": "3.10.0", "aliases": ["py", "python3"]},
+            {"language": "javascript", "version": "18.15.0", "aliases": ["js", "node"]}
+        ])
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/graphql", self.graphql)
+        app.router.add_post("/execute", self.execute)
+        app.router.add_get("/runtimes", self.runtimes)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+class FakeMessage:
+    def __init__(self, channel, content=None, embed=None):
+        self.channel = channel
+        self.content = content
+        self.embed = embed
+
+    async def edit(self, content=None, embed=None, view=None):
+        await asyncio.sleep(self.channel.api_latency)
+        self.content = content
+        if embed is not None:
+            self.embed = embed
+        self.channel.last = self
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+class FakeChannel:
+    """Records what a handler sent; `api_latency` simulates the Discord REST round trip."""
+
+    def __init__(self, channel_id, guild, api_latency):
+        self.id = channel_id
+        self.guild = guild
+        self.api_latency = api_latency
+        self.last = None
+
+    async def send(self, content=None, embed=None):
+        await asyncio.sleep(self.api_latency)
+        self.last = FakeMessage(self, content, embed)
+        return self.last
+
+class FakeAuthor:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"user{user_id}"
+
+    def __str__(self):
+        return self.name
+
+class FakeContext:
+    def __init__(self, user_id, channel):
+        self.author = FakeAuthor(user_id)
+        self.channel = channel
+        self.guild = channel.guild
+
+    async def send(self, content=None, embed=None):
+        return await self.channel.send(content, embed=embed)
+
+def classify(message):
+    """Maps the handler's final message to ok / rejected / error."""
+    if message is None:
+        return "error"
+    if message.embed is not None:
+        return "ok"
+    content = message.content or ""
+    if content.startswith("🚦"):
+        return "rejected"
+    if content.startswith("**"):
+        return "ok" # plain-text reports such as !stats
+    return "error"
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a sleeping task; blocking calls show up as lag."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": (ordered[-1] if ordered else float("nan")) * 1000,
+        "mean_ms": (statistics.fmean(ordered) if ordered else float("nan")) * 1000
+    }
+
+def prepare_workdir():
+    """Creates a scratch working directory with the read-only data files linked in."""
+    workdir = tempfile.mkdtemp(prefix="dsabot-loadtest-")
+    os.makedirs(os.path.join(workdir, "data"))
+    for name in ("450DSA.json", "testcases.json"):
+        source = os.path.join(REPO_DIR, "data", name)
+        if os.path.exists(source):
+            os.symlink(source, os.path.join(workdir, "data", name))
+    return workdir
+
+def import_bot(args):
+    """Imports bot.py with a harmless environment and loads its services (no gateway involved)."""
+    os.environ.setdefault("DISCORD_TOKEN", "loadtest")
+    os.environ.setdefault("CHANNEL_ID", "1")
+    os.environ["RUNNER_BACKEND"] = "piston"
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["BANK_WATCH_INTERVAL"] = "0"
+    os.environ["SUBMIT_WORKERS"] = str(args.workers)
+    os.environ["SUBMIT_QUEUE_SIZE"] = str(args.queue_size)
+    os.environ["SUBMIT_MAX_PER_USER"] = str(args.max_per_user)
+    os.environ["LOG_LEVEL"] = args.log_level
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    import bot
+    bot.load_services()
+    return bot
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}', choose from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+async def run(args):
+    bot = import_bot(args)
+    stubs = StubUpstreams(args.latency, args.jitter, args.failure_rate, args.seed)
+    await stubs.start()
+    bot.leetcode_service.BASE_URL = f"{stubs.base_url}/graphql"
+    bot.code_runner.backend.API_URL = f"{stubs.base_url}/execute"
+    bot.code_runner.backend.RUNTIMES_URL = f"{stubs.base_url}/runtimes"
+    bot.submission_queue.start()
+
+    rng = random.Random(args.seed)
+    guilds = [FakeGuild(1000 + i) for i in range(args.guilds)]
+    snippets = [f"print({i} * {i})" for i in range(args.distinct_snippets)]
+    topics = sorted(bot.striver_loader.index.topics.values()) or ["Array"]
+    weights = parse_mix(args.mix)
+    names, cumulative = list(weights), list(weights.values())
+
+    async def invoke(n):
+        scenario = rng.choices(names, weights=cumulative)[0]
+        channel = FakeChannel(n, rng.choice(guilds), args.discord_latency)
+        ctx = FakeContext(user_id=n, channel=channel)
+        if scenario == "daily" and args.cold_daily:
+            bot.leetcode_service._daily_expires_at = 0 # force a refresh (concurrent ones still coalesce)
+
+        start = time.perf_counter()
+        try:
+            if scenario == "submit":
+                await bot.submit_command.callback(ctx, code_block=f"```python\n{rng.choice(snippets)}\n```")
+            elif scenario == "daily":
+                await bot.post_daily_problem(channel, source_override="leetcode")
+            elif scenario == "stats":
+                await bot.stats_command.callback(ctx)
+            else:
+                await bot.topic_command.callback(ctx, topic_name=rng.choice(topics))
+            outcome = classify(channel.last)
+        except Exception as e:
+            outcome = "exception"
+            if args.verbose:
+                print(f"{scenario} #{n} raised {type(e).__name__}: {e}")
+        return scenario, outcome, time.perf_counter() - start
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(n):
+        async with semaphore:
+            return await invoke(n)
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    started = time.perf_counter()
+    results = await asyncio.gather(*(bounded(n) for n in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+
+    await bot.submission_queue.close()
+    await bot.code_runner.close()
+    await bot.leetcode_service.close()
+    await stubs.close()
+    return report(bot, args, results, elapsed, monitor, stubs)
+
+def report(bot, args, results, elapsed, monitor, stubs):
+    by_scenario = {}
+    for scenario, outcome, latency in results:
+        entry = by_scenario.setdefault(scenario, {"latencies": [], "outcomes": {}})
+        entry["latencies"].append(latency)
+        entry["outcomes"][outcome] = entry["outcomes"].get(outcome, 0) + 1
+
+    summary = {
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(results) / elapsed if elapsed else 0.0,
+        "overall": summarize([latency for _, _, latency in results]),
+        "scenarios": {name: dict(summarize(entry["latencies"]), outcomes=entry["outcomes"])
+                      for name, entry in sorted(by_scenario.items())},
+        "loop_lag": summarize(monitor.samples),
+        "upstream_requests": stubs.requests,
+        "code_cache": bot.code_runner.cache_stats(),
+        "circuits": {name: breaker.stats() for name, breaker in bot.all_breakers().items()}
+    }
+    if args.json:
+        print(json.dumps(summary, indent=2, default=str))
+        return summary
+
+    print(f"{summary['requests']} invocations, concurrency {args.concurrency}, "
+          f"{elapsed:.2f}s -> {summary['throughput_rps']:.0f} req/s")
+    print(f"{'scenario':<9} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  outcomes")
+    rows = list(summary["scenarios"].items()) + [("all", summary["overall"])]
+    for name, stats in rows:
+        outcomes = ", ".join(f"{k}={v}" for k, v in sorted(stats.get("outcomes", {}).items()))
+        print(f"{name:<9} {stats['count']:>6} {stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms "
+              f"{stats['p99_ms']:>7.1f}ms {stats['max_ms']:>7.1f}ms  {outcomes}")
+    lag = summary["loop_lag"]
+    print(f"event loop lag: p50 {lag['p50_ms']:.2f}ms, p99 {lag['p99_ms']:.2f}ms, max {lag['max_ms']:.2f}ms "
+          f"({lag['count']} samples)")
+    print(f"upstream requests: {stubs.requests}")
+    cache = summary["code_cache"]
+    print(f"code cache: {cache['hits']} hits / {cache['misses']} misses, {cache['coalesced']} coalesced")
+    for name, stats in summary["circuits"].items():
+        print(f"circuit {name}: {stats['state']}, {stats['rejected']} rejected, {stats['hedges']} hedges")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the bot's command handlers against stub upstreams.")
+    parser.add_argument("--requests", type=int, default=2000, help="total simulated command invocations")
+    parser.add_argument("--concurrency", type=int, default=500, help="invocations in flight at once")
+    parser.add_argument("--mix", default="submit=4,daily=2,stats=2,topic=2", help="scenario weights")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub upstream latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="+/- random jitter on the stub latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of stub requests answered with 503")
+    parser.add_argument("--discord-latency", type=float, default=0.0, help="simulated Discord send/edit latency")
+    parser.add_argument("--cold-daily", action="store_true", help="expire the LeetCode daily cache before every !daily")
+    parser.add_argument("--distinct-snippets", type=int, default=100, help="distinct !submit programs (fewer = more cache hits)")
+    parser.add_argument("--guilds", type=int, default=10, help="distinct guilds (each has its own posted history)")
+    parser.add_argument("--workers", type=int, default=3, help="SUBMIT_WORKERS")
+    parser.add_argument("--queue-size", type=int, default=50, help="SUBMIT_QUEUE_SIZE")
+    parser.add_argument("--max-per-user", type=int, default=2, help="SUBMIT_MAX_PER_USER")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--keep-workdir", action="store_true", help="don't delete the scratch directory")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    workdir = prepare_workdir()
+    os.chdir(workdir) # the services use repo-relative data/ paths
+    try:
+        asyncio.run(run(args))
+    finally:
+        os.chdir(REPO_DIR)
+        if args.keep_workdir:
+            print(f"scratch directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+import asyncio
+import logging
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError: # Windows: no rlimits, LocalBackend refuses to start
+    resource = None
+
+# Runs inside each pre-warmed interpreter: waits for "<code length>\n<code>" on
+# stdin, then executes it as __main__. Whatever follows the code is the program's stdin.
+PYTHON_BOOTSTRAP = (
+    "import sys\n"
+    "size = int(sys.stdin.buffer.readline())\n"
+    "source = sys.stdin.buffer.read(size).decode('utf-8')\n"
+    "del size\n"
+    "sys.argv = ['main.py']\n"
+    "exec(compile(source, 'main.py', 'exec'), {'__name__': '__main__', '__builtins__': __builtins__})\n"
+)
+
+# Exec wrapper: applies the rlimits given as arguments, then replaces itself with
+# the program. Limits are set here rather than in a preexec_fn, which is not safe
+# to run in a child forked from a process with other threads.
+LIMITS_SHIM = (
+    "import os, resource, sys\n"
+    "cpu, fsize, nproc, mem = map(int, sys.argv[1:5])\n"
+    "resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))\n"
+    "resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))\n"
+    "resource.setrlimit(resource.RLIMIT_NPROC, (nproc, nproc))\n"
+    "resource.setrlimit(resource.RLIMIT_CORE, (0, 0))\n"
+    "if mem:\n"
+    "    resource.setrlimit(resource.RLIMIT_AS, (mem, mem))\n"
+    "os.execvp(sys.argv[5], sys.argv[5:])\n"
+)
+
+JAVA_PUBLIC_CLASS = re.compile(r"public\s+(?:final\s+)?class\s+(\w+)")
+# Braces, type declarations and main methods, with comments and literals blanked out first
+JAVA_NOISE = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'', re.S)
+JAVA_TOKENS = re.compile(
+    r"(?P<open>\{)|(?P<close>\})|\b(?:class|interface|enum|record)\s+(?P<name>\w+)"
+    r"|(?P<main>\bstatic\s+(?:final\s+)?void\s+main\s*\()"
+)
+
+def java_main_class(code):
+    """Name of the first top-level class that declares main, or None."""
+    depth, pending, current = 0, None, None
+    for token in JAVA_TOKENS.finditer(JAVA_NOISE.sub('""', code)):
+        if token.group("open"):
+            if depth == 0:
+                current, pending = pending, None
+            depth += 1
+        elif token.group("close"):
+            depth = max(0, depth - 1)
+            if depth == 0:
+                current = None
+        elif token.group("name"):
+            if depth == 0:
+                pending = token.group("name")
+        elif current is not None:
+            return current
+    return None
+
+class LocalBackend:
+    """
+    Executes code in local subprocesses, for environments that can't reach Piston.
+    Each run gets a fresh process and temp directory with rlimits on CPU time,
+    address space and file size, a wall-clock timeout, and a cap on captured
+    output. RLIMIT_NPROC counts every process of the bot's user, not just the
+    run's, so MAX_PROCESSES is a fork-bomb guard rather than a per-run cap
+    (run the bot under a dedicated user to keep it meaningful). Python runs are
+    served from a pool of pre-started interpreters (each used once) so
+    interpreter startup is off the request path.
+    Compiled languages are available when their toolchain is on PATH.
+
+    This is resource isolation, not a security boundary: run it in a container
+    or a throwaway VM, never on a host with secrets.
+    """
+
+    CPU_SECONDS = 5
+    WALL_SECONDS = 10
+    MEMORY_BYTES = 256 * 1024 * 1024
+    MAX_OUTPUT_BYTES = 64 * 1024 # per stream
+    MAX_FILE_BYTES = 1024 * 1024
+    MAX_PROCESSES = 64 # RLIMIT_NPROC, per UID: bounds a fork bomb, not one run's children
+    POOL_SIZE = 4 # pre-warmed Python interpreters
+
+    def __init__(self, pool_size=None, max_output_bytes=None):
+        if resource is None:
+            raise RuntimeError("LocalBackend needs POSIX rlimits (the resource module).")
+        self.pool_size = self.POOL_SIZE if pool_size is None else pool_size
+        self.max_output_bytes = max_output_bytes or self.MAX_OUTPUT_BYTES
+        self._idle = [] # (process, workdir) ready to run Python
+        self._refills = set()
+        self._closed = False
+        self.toolchains = self._discover_toolchains()
+        logging.info(f"LocalBackend: available languages: {sorted(self.toolchains)}")
+
+    @staticmethod
+    def _discover_toolchains():
+        """Maps language -> required executables, keeping only those installed."""
+        wanted = {
+            "python": [sys.executable],
+            "c": ["gcc"],
+            "cpp": ["g++"],
+            "go": ["go"],
+            "java": ["javac", "java"],
+            "javascript": ["node"]
+        }
+        return {
+            lang: tools for lang, tools in wanted.items()
+            if all(os.path.isabs(tool) or shutil.which(tool) for tool in tools)
+        }
+
+    def _limited(self, args, memory=True):
+        """Wraps a command line in LIMITS_SHIM, which applies the rlimits and then execs it."""
+        limits = [self.CPU_SECONDS, self.MAX_FILE_BYTES, self.MAX_PROCESSES, self.MEMORY_BYTES if memory else 0]
+        return [sys.executable, "-I", "-S", "-c", LIMITS_SHIM, *map(str, limits), *args]
+
+    @staticmethod
+    def _env(workdir):
+        return {
+            "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+            "HOME": workdir,
+            "TMPDIR": workdir,
+            "LANG": "C.UTF-8",
+            "GOCACHE": os.path.join(tempfile.gettempdir(), "dsabot-gocache"), # shared so builds stay warm
+            "PYTHONIOENCODING": "utf-8"
+        }
+
+    async def _spawn(self, args, workdir, memory=True):
+        return await asyncio.create_subprocess_exec(
+            *self._limited(args, memory),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=workdir,
+            env=self._env(workdir),
+            start_new_session=True # own process group, so a timeout kills any children too
+        )
+
+    async def _spawn_python(self):
+        workdir = tempfile.mkdtemp(prefix="dsabot-run-")
+        proc = await self._spawn([sys.executable, "-I", "-S", "-u", "-c", PYTHON_BOOTSTRAP], workdir)
+        return proc, workdir
+
+    def _refill(self):
+        """Tops the idle pool back up in the background."""
+        missing = self.pool_size - len(self._idle) - len(self._refills)
+        for _ in range(max(0, missing)):
+            task = asyncio.ensure_future(self._spawn_python())
+            self._refills.add(task)
+            task.add_done_callback(self._pool_ready)
+
+    def _pool_ready(self, task):
+        self._refills.discard(task)
+        if task.cancelled() or task.exception() is not None:
+            return
+        proc, workdir = task.result()
+        if self._closed:
+            self._kill(proc)
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            self._idle.append((proc, workdir))
+
+    async def _take_python(self):
+        """Returns a pre-warmed interpreter, or starts one if the pool is empty."""
+        while self._idle:
+            proc, workdir = self._idle.pop()
+            if proc.returncode is None:
+                self._refill()
+                return proc, workdir
+            shutil.rmtree(workdir, ignore_errors=True)
+        self._refill()
+        return await self._spawn_python()
+
+    @staticmethod
+    def _kill(proc):
+        if proc.returncode is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    async def _read_capped(self, stream, limit, proc):
+        """Reads a stream keeping at most `limit` bytes; kills the process once exceeded."""
+        chunks, size = [], 0
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                return b"".join(chunks), False
+            chunks.append(chunk[:limit - size])
+            size += len(chunk)
+            if size > limit:
+                self._kill(proc)
+                return b"".join(chunks), True
+
+    async def _communicate(self, proc, stdin_bytes, timeout):
+        """Feeds stdin and collects capped output under a wall-clock timeout."""
+        async def feed():
+            try:
+                proc.stdin.write(stdin_bytes)
+                await proc.stdin.drain()
+                proc.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass # the program exited without reading all of its input
+
+        timed_out = False
+        start = time.perf_counter()
+        readers = asyncio.gather(
+            self._read_capped(proc.stdout, self.max_output_bytes, proc),
+            self._read_capped(proc.stderr, self.max_output_bytes, proc),
+            feed()
+        )
+        try:
+            await asyncio.wait_for(asyncio.shield(readers), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            self._kill(proc) # readers then hit EOF, keeping the partial output
+        (stdout, out_cut), (stderr, err_cut), _ = await readers
+        await proc.wait()
+        elapsed = time.perf_counter() - start
+
+        stdout = stdout.decode("utf-8", "replace")
+        stderr = stderr.decode("utf-8", "replace")
+        if out_cut or err_cut:
+            stderr += f"\n[output truncated at {self.max_output_bytes} bytes]"
+        if timed_out:
+            stderr += f"\n[killed: wall-clock limit of {timeout}s exceeded]"
+
+        returncode = proc.returncode
+        if returncode == -signal.SIGXCPU:
+            stderr += f"\n[killed: CPU time limit of {self.CPU_SECONDS}s exceeded]"
+        return {
+            "stdout": stdout,
+            "stderr": stderr,
+            "output": stdout + stderr, # Combined output
+            "code": returncode if returncode >= 0 else None, # Exit code
+            "signal": signal.Signals(-returncode).name if returncode < 0 else None,
+            "truncated": out_cut or err_cut,
+            "time": elapsed # the program's run only, not compilation
+        }
+
+    async def resolve(self, language):
+        """Local runs have no versions; a language is available if its toolchain is installed."""
+        return (language, None) if language in self.toolchains else None
+
+    async def runtimes(self):
+        return [{"language": lang, "version": "local", "aliases": []} for lang in sorted(self.toolchains)]
+
+    async def execute(self, lang, code, stdin="", version=None):
+        return (await self.execute_cases(lang, code, [stdin], version))[0]
+
+    async def execute_cases(self, lang, code, inputs, version=None, parallel=1, timeout=None):
+        """
+        Runs one program once per input, at most `parallel` at a time, each under a
+        `timeout` wall-clock limit (WALL_SECONDS by default). Compiled languages are
+        built once and every run gets its own fresh working directory.
+        Returns one result dict per input.
+        """
+        timeout = min(timeout or self.WALL_SECONDS, self.WALL_SECONDS)
+        self._closed = False # reopened after close(), e.g. by CodeRunner.execute_code
+        if lang not in self.toolchains:
+            return [{"error": f"Language '{lang}' is not available on the local runner."}] * len(inputs)
+        semaphore = asyncio.Semaphore(parallel)
+
+        if lang == "python":
+            async def run_python(stdin):
+                async with semaphore:
+                    proc, workdir = await self._take_python()
+                    try:
+                        source = code.encode("utf-8")
+                        payload = f"{len(source)}\n".encode() + source + stdin.encode("utf-8")
+                        return await self._communicate(proc, payload, timeout)
+                    finally:
+                        self._kill(proc)
+                        shutil.rmtree(workdir, ignore_errors=True)
+            return await asyncio.gather(*(run_python(stdin) for stdin in inputs))
+
+        builddir = tempfile.mkdtemp(prefix="dsabot-build-")
+        try:
+            built = await self._build(lang, code, builddir)
+            if isinstance(built, dict):
+                return [built] * len(inputs) # compilation failed
+
+            run_args, memory = built
+
+            async def run(stdin):
+                async with semaphore:
+                    workdir = tempfile.mkdtemp(prefix="dsabot-run-")
+                    try:
+                        proc = await self._spawn(run_args, workdir, memory=memory)
+                        return await self._communicate(proc, stdin.encode("utf-8"), timeout)
+                    finally:
+                        shutil.rmtree(workdir, ignore_errors=True)
+            return await asyncio.gather(*(run(stdin) for stdin in inputs))
+        finally:
+            shutil.rmtree(builddir, ignore_errors=True)
+
+    async def _build(self, lang, code, builddir):
+        """
+        Writes the source to `builddir` and compiles it if needed. Returns (run args, memory limit on),
+        with absolute paths so the program can run from any directory, or a result dict on failure.
+        """
+        compile_args = None
+        memory = True
+        binary = os.path.join(builddir, "main")
+        if lang == "c":
+            filename, compile_args, run_args = "main.c", ["gcc", "-O2", "-o", "main", "main.c", "-lm"], [binary]
+        elif lang == "cpp":
+            filename, compile_args, run_args = "main.cpp", ["g++", "-O2", "-o", "main", "main.cpp"], [binary]
+        elif lang == "go":
+            # The Go runtime reserves far more address space than it uses, so no RLIMIT_AS
+            filename, compile_args, run_args = "main.go", ["go", "build", "-o", "main", "main.go"], [binary]
+            memory = False
+        elif lang == "java":
+            # The file is named after the public class (javac requires it); the run starts the class with main
+            public = JAVA_PUBLIC_CLASS.search(code)
+            class_name = java_main_class(code) or (public.group(1) if public else "Main")
+            source_name = f"{public.group(1) if public else class_name}.java"
+            heap = f"-Xmx{self.MEMORY_BYTES // (1024 * 1024)}m"
+            filename, compile_args = source_name, ["javac", source_name]
+            run_args = ["java", heap, "-cp", builddir, class_name]
+            memory = False
+        else: # javascript
+            heap = f"--max-old-space-size={self.MEMORY_BYTES // (1024 * 1024)}"
+            filename, run_args = "main.js", ["node", heap, os.path.join(builddir, "main.js")]
+            memory = False
+
+        with open(os.path.join(builddir, filename), "w", encoding="utf-8") as f:
+            f.write(code)
+
+        if compile_args:
+            # Compilers are trusted, so only the wall clock and output caps apply
+            proc = await asyncio.create_subprocess_exec(
+                *compile_args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=builddir,
+                env=self._env(builddir),
+                start_new_session=True
+            )
+            compiled = await self._communicate_compile(proc)
+            if compiled is not None:
+                return compiled
+        return run_args, memory
+
+    async def _communicate_compile(self, proc):
+        """Waits for a compiler; returns a result dict on failure, None on success."""
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), self.WALL_SECONDS * 3)
+        except asyncio.TimeoutError:
+            self._kill(proc)
+            await proc.wait()
+            return {"stdout": "", "stderr": "[compilation timed out]", "output": "[compilation timed out]", "code": None, "signal": "SIGKILL"}
+        if proc.returncode == 0:
+            return None
+        message = (stdout + stderr)[:self.max_output_bytes].decode("utf-8", "replace")
+        return {"stdout": "", "stderr": message, "output": message, "code": proc.returncode, "signal": None}
+
+    async def close(self):
+        """Kills pre-warmed interpreters and removes their temp directories."""
+        self._closed = True
+        for task in list(self._refills):
+            task.cancel()
+        while self._idle:
+            proc, workdir = self._idle.pop()
+            self._kill(proc)
+            await proc.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
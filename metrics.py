@@ -0,0 +1,195 @@
+import asyncio
+import bisect
+import logging
+import time
+
+# Upper bounds (seconds) for latency histograms; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative when rendered, like Prometheus)."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile (None when empty)."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class UpstreamCall:
+    """Context manager timing one upstream HTTP request; set `status` once a response arrives."""
+
+    __slots__ = ("registry", "upstream", "status", "start")
+
+    def __init__(self, registry, upstream):
+        self.registry = registry
+        self.upstream = upstream
+        self.status = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        status = self.status
+        if status is None:
+            if exc_type is asyncio.CancelledError:
+                status = "cancelled" # e.g. the losing half of a hedged request
+            elif exc_type is not None and issubclass(exc_type, asyncio.TimeoutError):
+                status = "timeout"
+            else:
+                status = "error"
+        self.registry.observe("dsabot_upstream_request_seconds", time.perf_counter() - self.start,
+                              upstream=self.upstream, status=str(status))
+        return False
+
+class Metrics:
+    """
+    In-process metrics registry: counters, latency histograms and gauges read
+    from callbacks at scrape time (queue depth, cache and breaker stats), so the
+    hot path only pays for a dict lookup and an increment.
+    """
+
+    HELP = {
+        "dsabot_command_seconds": "Latency of bot commands, by command and outcome.",
+        "dsabot_upstream_request_seconds": "Latency of HTTP requests to LeetCode and Piston, by status.",
+        "dsabot_scheduled_post_seconds": "Time to build and send one scheduled daily post.",
+        "dsabot_scheduled_posts_total": "Scheduled daily posts, by outcome."
+    }
+
+    def __init__(self):
+        self._counters = {} # (name, labels) -> value
+        self._histograms = {} # (name, labels) -> Histogram
+        self._collectors = [] # callables yielding (name, labels dict, value)
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def upstream(self, name):
+        return UpstreamCall(self, name)
+
+    def add_collector(self, collect):
+        """Registers a callable yielding (name, labels, value) gauge samples at scrape time."""
+        self._collectors.append(collect)
+
+    def histograms(self, name):
+        """Returns {sorted label pairs: Histogram} for one metric name."""
+        return {labels: histogram for (metric, labels), histogram in self._histograms.items() if metric == name}
+
+    def counters(self, name):
+        return {labels: value for (metric, labels), value in self._counters.items() if metric == name}
+
+    def gauges(self):
+        samples = []
+        for collect in self._collectors:
+            try:
+                samples.extend(collect())
+            except Exception as e:
+                logging.warning(f"Metrics: collector {collect} failed: {e}")
+        return samples
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in labels)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+    def _header(self, lines, name, kind):
+        if name in self.HELP:
+            lines.append(f"# HELP {name} {self.HELP[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        seen = set()
+        for (name, labels), value in sorted(self._counters.items()):
+            if name not in seen:
+                seen.add(name)
+                self._header(lines, name, "counter")
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            if name not in seen:
+                seen.add(name)
+                self._header(lines, name, "histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {histogram.count}")
+
+        for name, labels, value in sorted(self.gauges(), key=lambda sample: sample[0]):
+            if name not in seen:
+                seen.add(name)
+                self._header(lines, name, "gauge")
+            lines.append(f"{name}{self._format_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """Serves GET /metrics for Prometheus on a local port."""
+
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        # aiohttp.web takes tens of milliseconds to import, so only load it when the endpoint is enabled
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            logging.error(f"Metrics: could not listen on {self.host}:{self.port}: {e}")
+            await self.close()
+            return
+        logging.info(f"Metrics: serving http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+# Process-wide registry shared by the services and bot.py
+registry = Metrics()
@@ -0,0 +1,168 @@
+import gzip
+import io
+import secrets
+
+import discord
+
+from result_cache import ResultCache
+
+class OutputPages:
+    """
+    Page boundaries over a run's stdout and stderr. Only (stream, start, end)
+    offsets are kept; a page's text is sliced out when it is shown.
+    """
+
+    def __init__(self, stdout, stderr, page_chars):
+        self.streams = [(name, text) for name, text in (("stdout", stdout), ("stderr", stderr)) if text]
+        self._pages = []
+        for stream, (_, text) in enumerate(self.streams):
+            first = len(self._pages)
+            start = 0
+            while start < len(text):
+                end = min(len(text), start + page_chars)
+                if end < len(text):
+                    newline = text.rfind("\n", start, end)
+                    if newline > start:
+                        end = newline + 1 # break pages between lines when possible
+                self._pages.append((stream, start, end, first))
+                start = end
+        self._stream_pages = {} # stream -> page count within it
+        for stream, _, _, _ in self._pages:
+            self._stream_pages[stream] = self._stream_pages.get(stream, 0) + 1
+
+    def __len__(self):
+        return len(self._pages)
+
+    @property
+    def size(self):
+        return sum(len(text) for _, text in self.streams)
+
+    def page(self, number):
+        """Returns (stream name, text, page within the stream, pages in the stream)."""
+        stream, start, end, first = self._pages[number]
+        name, text = self.streams[stream]
+        return name, text[start:end], number - first + 1, self._stream_pages[stream]
+
+    def as_text(self):
+        return "\n".join(f"===== {name} =====\n{text}" for name, text in self.streams)
+
+class OutputPager:
+    """
+    Short-lived server-side buffer for run output too long for one message.
+    The message shows one page at a time; its Prev/Next buttons fetch the next
+    page from the buffer and edit just that page in, and Download sends the
+    whole output once as a gzip attachment. Buffers expire after `ttl` seconds
+    and share a byte budget, so old or excess outputs are dropped first.
+    """
+
+    PAGE_CHARS = 1800 # per embed page, well under the 4096 description limit
+    FIELD_CHARS = 1024 # Discord's embed field value limit; inline output must fit once rendered
+
+    def __init__(self, ttl=600, max_buffers=200, max_bytes=16 * 1024 * 1024):
+        self.ttl = ttl
+        self._buffers = ResultCache(max_entries=max_buffers, max_bytes=max_bytes, ttl=ttl)
+
+    @classmethod
+    def fits_inline(cls, stdout, stderr):
+        """True if both streams fit in an embed field as rendered by code_block (fences and escapes included)."""
+        return all(len(cls.code_block(text)) <= cls.FIELD_CHARS for text in (stdout or "(No Output)", stderr))
+
+    @staticmethod
+    def code_block(text):
+        # A stray ``` in the output would close the block early
+        return "```\n" + text.replace("```", "`\u200b``") + "\n```"
+
+    def store(self, stdout, stderr, title, color, footer):
+        """Buffers a run's output and returns (token, page count)."""
+        pages = OutputPages(stdout, stderr, self.PAGE_CHARS)
+        token = secrets.token_urlsafe(8)
+        self._buffers.put(token, (pages, title, color, footer), pages.size)
+        return token, len(pages)
+
+    def render(self, token, number):
+        """Embed for one page of a buffered output, or None once the buffer has expired."""
+        entry = self._buffers.get(token)
+        if entry is None:
+            return None
+        pages, title, color, footer = entry
+        name, text, stream_page, stream_pages = pages.page(number)
+        embed = discord.Embed(title=title, description=self.code_block(text), color=color)
+        embed.set_footer(text=f"{name} {stream_page}/{stream_pages} | page {number + 1}/{len(pages)} | {footer}")
+        return embed
+
+    def attachment(self, token):
+        """The whole buffered output as a gzip file, or None once the buffer has expired."""
+        entry = self._buffers.get(token)
+        if entry is None:
+            return None
+        data = gzip.compress(entry[0].as_text().encode("utf-8"))
+        return discord.File(io.BytesIO(data), filename="output.txt.gz")
+
+    def stats(self):
+        stats = self._buffers.stats()
+        return {"buffers": stats["entries"], "bytes": stats["bytes"], "evictions": stats["evictions"]}
+
+    def view(self, token, page_count, author_id):
+        return OutputPagerView(self, token, page_count, author_id)
+
+class OutputPagerView(discord.ui.View):
+    """
+    Prev/Next/Download buttons for one paged output message. Only the member who
+    ran the code can page through it; anyone may download a private copy.
+    """
+
+    EXPIRED = "This output has expired; run the code again to see it."
+    NOT_AUTHOR = "Only the member who ran this code can page through it; use Download for your own copy."
+
+    def __init__(self, pager, token, page_count, author_id):
+        super().__init__(timeout=pager.ttl)
+        self.pager = pager
+        self.token = token
+        self.page_count = page_count
+        self.author_id = author_id
+        self.page = 0
+        self.message = None # set by the sender, so the buttons can be disabled on timeout
+        self._update_buttons()
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id == self.author_id or interaction.data.get("custom_id") == self.download.custom_id:
+            return True
+        await interaction.response.send_message(self.NOT_AUTHOR, ephemeral=True)
+        return False
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def _show(self, interaction, page):
+        embed = self.pager.render(self.token, page)
+        if embed is None:
+            self.stop()
+            await interaction.response.edit_message(content=self.EXPIRED, embed=None, view=None)
+            return
+        self.page = page
+        self._update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="Prev", emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self._show(interaction, max(0, self.page - 1))
+
+    @discord.ui.button(label="Next", emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self._show(interaction, min(self.page_count - 1, self.page + 1))
+
+    @discord.ui.button(label="Download", emoji="📦", style=discord.ButtonStyle.primary)
+    async def download(self, interaction, button):
+        attachment = self.pager.attachment(self.token)
+        if attachment is None:
+            await interaction.response.send_message(self.EXPIRED, ephemeral=True)
+            return
+        await interaction.response.send_message(file=attachment, ephemeral=True)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass # deleted or no longer editable
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+class PostedStore:
+    """
+    Durable history of posted questions, backed by SQLite in WAL mode.
+    Each post is a single-row insert committed atomically, so a crash can never
+    leave a half-written history behind. A legacy posted_questions.json file is
+    imported on first open and renamed to *.migrated.
+    """
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # May be opened in a worker thread at startup, then used from the event loop only
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS posted (
+                source TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                posted_at REAL NOT NULL,
+                PRIMARY KEY (source, question_id)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self._conn.commit()
+        self._data_version = self._read_data_version()
+        if legacy_json:
+            self._migrate_json(legacy_json)
+
+    def _migrate_json(self, legacy_json):
+        if not os.path.exists(legacy_json):
+            return
+        try:
+            with open(legacy_json, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not migrate {legacy_json}: {e}")
+            return
+
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO posted (source, question_id, posted_at) VALUES ('striver', ?, ?)",
+                [(str(q_id), now) for q_id in legacy.get("striver", [])]
+            )
+            last_daily = legacy.get("leetcode_daily_last_posted")
+            if last_daily is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('leetcode_daily_last_posted', ?)",
+                    (str(last_daily),)
+                )
+        os.replace(legacy_json, legacy_json + ".migrated")
+        logging.info(f"Migrated {len(legacy.get('striver', []))} posted ids from {legacy_json} to {self.path}.")
+
+    def _read_data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed_externally(self):
+        """True if another process (another shard) committed to this database since the last check."""
+        version = self._read_data_version()
+        changed, self._data_version = version != self._data_version, version
+        return changed
+
+    def load_posted(self, source="striver"):
+        """Returns the set of posted question ids for a source."""
+        rows = self._conn.execute("SELECT question_id FROM posted WHERE source = ?", (source,))
+        return {row[0] for row in rows}
+
+    def add_posted(self, question_id, source="striver"):
+        """Records a posted question. Returns False if it was already recorded."""
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO posted (source, question_id, posted_at) VALUES (?, ?, ?)",
+                (source, str(question_id), time.time())
+            )
+        return cursor.rowcount == 1
+
+    def update_posted(self, add=(), remove=(), source="striver"):
+        """Adds and removes posted ids for a source in a single transaction."""
+        if not add and not remove:
+            return
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM posted WHERE source = ? AND question_id = ?",
+                [(source, str(q_id)) for q_id in remove]
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO posted (source, question_id, posted_at) VALUES (?, ?, ?)",
+                [(source, str(q_id), now) for q_id in add]
+            )
+
+    def get_meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        self._conn.close()
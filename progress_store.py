@@ -0,0 +1,233 @@
+import asyncio
+import bisect
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+class UserProgress:
+    """Counters for one user in one guild."""
+
+    __slots__ = ("solved", "runs", "streak", "best_streak", "last_day", "last_solved_at", "solved_ids")
+
+    def __init__(self, solved=0, runs=0, streak=0, best_streak=0, last_day=None, last_solved_at=0.0):
+        self.solved = solved
+        self.runs = runs
+        self.streak = streak
+        self.best_streak = best_streak
+        self.last_day = last_day # ISO date (UTC) of the latest solve
+        self.last_solved_at = last_solved_at
+        self.solved_ids = set()
+
+    def current_streak(self, today):
+        """The streak only counts if the user solved something today or yesterday."""
+        if self.last_day is None:
+            return 0
+        yesterday = (datetime.fromisoformat(today) - timedelta(days=1)).date().isoformat()
+        return self.streak if self.last_day in (today, yesterday) else 0
+
+class ProgressStore:
+    """
+    Per-user solve tracking and per-guild leaderboards.
+    Everything is kept in memory and updated incrementally on each run: a dict
+    of UserProgress per guild for O(1) lookups, and a sorted ranking list per
+    guild (more solves first, earlier finisher wins ties) kept in order with
+    bisect. Changes are queued and written to SQLite in batches by a background
+    task running in a worker thread, so commands never wait on the disk.
+    """
+
+    FLUSH_INTERVAL = 2.0 # seconds between background writes
+    BATCH_SIZE = 200 # flush early once this many changes are queued
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Only the flusher thread touches the connection after loading
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS user_progress (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                solved INTEGER NOT NULL,
+                runs INTEGER NOT NULL,
+                streak INTEGER NOT NULL,
+                best_streak INTEGER NOT NULL,
+                last_day TEXT,
+                last_solved_at REAL NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            );
+            CREATE TABLE IF NOT EXISTS solves (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                problem_id TEXT NOT NULL,
+                solved_at REAL NOT NULL,
+                PRIMARY KEY (guild_id, user_id, problem_id)
+            );
+        """)
+        self._conn.commit()
+
+        self._users = {} # guild_id -> {user_id: UserProgress}
+        self._rankings = {} # guild_id -> sorted [(-solved, last_solved_at, user_id)]
+        self._dirty = {} # (guild_id, user_id) -> UserProgress to write
+        self._new_solves = [] # (guild_id, user_id, problem_id, solved_at) to insert
+        self._wake = None
+        self._flusher = None
+        self._closing = False
+        self._load()
+
+    def _load(self):
+        for guild_id, user_id, *counters in self._conn.execute(
+            "SELECT guild_id, user_id, solved, runs, streak, best_streak, last_day, last_solved_at FROM user_progress"
+        ):
+            progress = self._users.setdefault(guild_id, {})[user_id] = UserProgress(*counters)
+            if progress.solved:
+                self._rankings.setdefault(guild_id, []).append(self._rank_key(user_id, progress))
+        for ranking in self._rankings.values():
+            ranking.sort()
+        for guild_id, user_id, problem_id in self._conn.execute("SELECT guild_id, user_id, problem_id FROM solves"):
+            progress = self._users.get(guild_id, {}).get(user_id)
+            if progress is not None:
+                progress.solved_ids.add(problem_id)
+
+    @staticmethod
+    def _rank_key(user_id, progress):
+        return (-progress.solved, progress.last_solved_at, user_id)
+
+    @staticmethod
+    def _guild_key(guild_id):
+        return guild_id or 0 # DMs share one pseudo-guild
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date().isoformat()
+
+    def record_run(self, guild_id, user_id, problem_id=None, solved=False):
+        """
+        Counts a successful run; if `solved`, credits `problem_id` (once per user).
+        Returns True when this was the user's first solve of that problem.
+        """
+        guild_id = self._guild_key(guild_id)
+        users = self._users.setdefault(guild_id, {})
+        progress = users.get(user_id)
+        if progress is None:
+            progress = users[user_id] = UserProgress()
+        progress.runs += 1
+        self._dirty[(guild_id, user_id)] = progress
+
+        first_solve = solved and problem_id is not None and problem_id not in progress.solved_ids
+        if first_solve:
+            now = time.time()
+            ranking = self._rankings.setdefault(guild_id, [])
+            if progress.solved:
+                old_key = self._rank_key(user_id, progress)
+                del ranking[bisect.bisect_left(ranking, old_key)]
+
+            today = self._today()
+            if progress.last_day != today:
+                yesterday = (datetime.fromisoformat(today) - timedelta(days=1)).date().isoformat()
+                progress.streak = progress.streak + 1 if progress.last_day == yesterday else 1
+                progress.best_streak = max(progress.best_streak, progress.streak)
+                progress.last_day = today
+            progress.solved += 1
+            progress.last_solved_at = now
+            progress.solved_ids.add(problem_id)
+            bisect.insort(ranking, self._rank_key(user_id, progress))
+            self._new_solves.append((guild_id, user_id, problem_id, now))
+
+        if self._wake is not None and len(self._dirty) + len(self._new_solves) >= self.BATCH_SIZE:
+            self._wake.set()
+        return first_solve
+
+    def user_stats(self, guild_id, user_id):
+        """Returns the user's counters and rank in the guild, or None if they never ran anything."""
+        guild_id = self._guild_key(guild_id)
+        progress = self._users.get(guild_id, {}).get(user_id)
+        if progress is None:
+            return None
+        ranking = self._rankings.get(guild_id, [])
+        rank = bisect.bisect_left(ranking, self._rank_key(user_id, progress)) + 1 if progress.solved else None
+        return {
+            "solved": progress.solved,
+            "runs": progress.runs,
+            "streak": progress.current_streak(self._today()),
+            "best_streak": progress.best_streak,
+            "rank": rank,
+            "ranked_users": len(ranking)
+        }
+
+    def leaderboard(self, guild_id, limit=10):
+        """Top `limit` users of a guild as [(user_id, solved, current streak)]."""
+        guild_id = self._guild_key(guild_id)
+        users = self._users.get(guild_id, {})
+        today = self._today()
+        return [
+            (user_id, -negative_solved, users[user_id].current_streak(today))
+            for negative_solved, _, user_id in self._rankings.get(guild_id, [])[:limit]
+        ]
+
+    def start(self):
+        """Starts the background flusher. Must be called from a running event loop."""
+        if self._flusher is None:
+            self._wake = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                logging.error(f"ProgressStore: flush failed, will retry: {e}")
+
+    async def flush(self):
+        """Writes queued changes in one transaction on a worker thread."""
+        if not self._dirty and not self._new_solves:
+            return
+        users = [
+            (guild_id, user_id, p.solved, p.runs, p.streak, p.best_streak, p.last_day, p.last_solved_at)
+            for (guild_id, user_id), p in self._dirty.items()
+        ]
+        solves = self._new_solves
+        self._dirty, self._new_solves = {}, []
+        try:
+            await asyncio.to_thread(self._write, users, solves)
+        except Exception:
+            # Put the batch back so the next flush retries it (newer user rows win)
+            self._new_solves = solves + self._new_solves
+            for row in users:
+                key = row[:2]
+                if key not in self._dirty:
+                    self._dirty[key] = self._users[key[0]][key[1]]
+            raise
+
+    def _write(self, users, solves):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO user_progress "
+                "(guild_id, user_id, solved, runs, streak, best_streak, last_day, last_solved_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                users
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO solves (guild_id, user_id, problem_id, solved_at) VALUES (?, ?, ?, ?)",
+                solves
+            )
+
+    async def close(self):
+        """Stops the flusher and writes whatever is still queued."""
+        if self._flusher is not None:
+            # Let the flusher finish its current write rather than cancelling it mid-transaction
+            self._closing = True
+            self._wake.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
@@ -0,0 +1,246 @@
+import argparse
+import hashlib
+import json
+import logging
+import marshal
+import os
+import sys
+import time
+from array import array
+
+SNAPSHOT_DIR = "data/snapshots"
+SNAPSHOT_MAGIC = b"DSASNAP1"
+SNAPSHOT_VERSION = 1
+
+class Question:
+    """
+    Compact question record. Supports dict-style access (q["title"], q.get(...))
+    so callers written against the old per-question dicts keep working.
+    """
+
+    __slots__ = ("id", "title", "difficulty", "topic", "link", "platform")
+
+    def __init__(self, id, title, difficulty, topic, link, platform):
+        self.id = id
+        self.title = title
+        self.difficulty = difficulty
+        self.topic = topic
+        self.link = link
+        self.platform = platform
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if isinstance(key, str) else default
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"Question(id={self.id!r}, title={self.title!r}, topic={self.topic!r})"
+
+def parse_sheet(path, sheet="Sheet1"):
+    """Parses a question sheet in the 450DSA JSON schema into Question records."""
+    # Use 'utf-8-sig' to handle files with BOM (Byte Order Mark)
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        data = json.load(f)
+
+    questions = []
+    key_cache = {} # row key layout -> (title_key, topic_key, link_key)
+    for i, q in enumerate(data.get(sheet, [])):
+        # Dynamic Key Discovery, done once per distinct row layout
+        layout = tuple(q.keys())
+        keys = key_cache.get(layout)
+        if keys is None:
+            # Use the first key that looks like "Topic", "Problem", "URL"
+            keys = key_cache[layout] = (
+                next((k for k in layout if "Problem" in k), "Problem"),
+                next((k for k in layout if "Topic" in k), "Topic"),
+                next((k for k in layout if "URL" in k or "Link" in k), "URL")
+            )
+        title_key, topic_key, link_key = keys
+
+        link = q.get(link_key, "").strip()
+        # Filter out empty or placeholder URLs
+        if not link or link == "<->":
+            continue
+
+        questions.append(Question(
+            id=str(i + 1),
+            title=q.get(title_key, "Unknown Problem").strip(),
+            difficulty="Medium", # Default difficulty
+            topic=sys.intern(q.get(topic_key, "General").strip()),
+            link=link,
+            platform="DSA Sheet"
+        ))
+    return questions
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def snapshot_path_for(path):
+    return os.path.join(SNAPSHOT_DIR, os.path.basename(path) + ".snap")
+
+def _pack(questions, source_key):
+    """Column-oriented layout: string columns plus interned lookup tables indexed by arrays."""
+    tables = {"topic": [], "difficulty": [], "platform": []}
+    lookups = {name: {} for name in tables}
+    indices = {name: array('H') for name in tables}
+    for q in questions:
+        for name in tables:
+            value = getattr(q, name)
+            slot = lookups[name].get(value)
+            if slot is None:
+                slot = lookups[name][value] = len(tables[name])
+                tables[name].append(value)
+            indices[name].append(slot)
+
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "source": source_key,
+        "ids": [q.id for q in questions],
+        "titles": [q.title for q in questions],
+        "links": [q.link for q in questions],
+        "tables": tables,
+        "indices": {name: idx.tobytes() for name, idx in indices.items()}
+    }
+    return SNAPSHOT_MAGIC + marshal.dumps(payload)
+
+def _unpack(blob):
+    if not blob.startswith(SNAPSHOT_MAGIC):
+        raise ValueError("not a question snapshot")
+    payload = marshal.loads(blob[len(SNAPSHOT_MAGIC):])
+    if payload.get("version") != SNAPSHOT_VERSION:
+        raise ValueError("snapshot version mismatch")
+    return payload
+
+def _questions_from_payload(payload):
+    tables = {name: [sys.intern(v) for v in values] for name, values in payload["tables"].items()}
+    indices = {}
+    for name, raw in payload["indices"].items():
+        indices[name] = array('H')
+        indices[name].frombytes(raw)
+
+    topics, difficulties, platforms = tables["topic"], tables["difficulty"], tables["platform"]
+    topic_idx, difficulty_idx, platform_idx = indices["topic"], indices["difficulty"], indices["platform"]
+    return [
+        Question(q_id, title, difficulties[difficulty_idx[i]], topics[topic_idx[i]], link, platforms[platform_idx[i]])
+        for i, (q_id, title, link) in enumerate(zip(payload["ids"], payload["titles"], payload["links"]))
+    ]
+
+def compile_snapshot(path, snapshot_path=None):
+    """Parses `path` and writes its snapshot atomically. Returns the parsed questions."""
+    snapshot_path = snapshot_path or snapshot_path_for(path)
+    stat = os.stat(path)
+    source_key = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": _file_hash(path),
+        "python": sys.version_info[:2] # marshal format is tied to the interpreter version
+    }
+    questions = parse_sheet(path)
+
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_pack(questions, source_key))
+    os.replace(tmp_path, snapshot_path)
+    return questions
+
+def load_snapshot(path, snapshot_path=None):
+    """
+    Returns questions from the snapshot of `path`, or None if it is missing or stale.
+    The snapshot is trusted when the source mtime and size match; otherwise the
+    source hash decides, so a touched-but-unchanged file doesn't force a rebuild.
+    """
+    snapshot_path = snapshot_path or snapshot_path_for(path)
+    try:
+        with open(snapshot_path, 'rb') as f:
+            payload = _unpack(f.read())
+    except (OSError, ValueError, EOFError, TypeError) as e:
+        logging.debug(f"No usable snapshot at {snapshot_path}: {e}")
+        return None
+
+    source = payload["source"]
+    if tuple(source.get("python", ())) != tuple(sys.version_info[:2]):
+        return None
+    stat = os.stat(path)
+    if source["mtime_ns"] != stat.st_mtime_ns or source["size"] != stat.st_size:
+        if source["size"] != stat.st_size or source["sha256"] != _file_hash(path):
+            return None
+    return _questions_from_payload(payload)
+
+def load_questions(path, use_snapshot=True):
+    """Loads a sheet, preferring a fresh snapshot and (re)building it when stale."""
+    if use_snapshot:
+        questions = load_snapshot(path)
+        if questions is not None:
+            return questions
+        try:
+            return compile_snapshot(path)
+        except OSError as e:
+            logging.warning(f"Could not write question snapshot for {path}: {e}")
+    return parse_sheet(path)
+
+def _legacy_parse(path):
+    """The pre-snapshot loader (per-row key discovery, one dict per question), for benchmarking."""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        data = json.load(f)
+    cleaned = []
+    for i, q in enumerate(data.get("Sheet1", [])):
+        title_key = next((k for k in q.keys() if "Problem" in k), "Problem")
+        topic_key = next((k for k in q.keys() if "Topic" in k), "Topic")
+        link_key = next((k for k in q.keys() if "URL" in k or "Link" in k), "URL")
+        link = q.get(link_key, "").strip()
+        if not link or link == "<->":
+            continue
+        cleaned.append({
+            "id": str(i + 1),
+            "title": q.get(title_key, "Unknown Problem").strip(),
+            "difficulty": "Medium",
+            "topic": q.get(topic_key, "General").strip(),
+            "link": link,
+            "platform": "DSA Sheet"
+        })
+    return cleaned
+
+def benchmark(path, repeat=20):
+    """Compares load time and retained memory of raw JSON parsing vs the snapshot."""
+    import tracemalloc
+
+    compile_snapshot(path)
+    loaders = [("raw json", lambda: _legacy_parse(path)), ("snapshot", lambda: load_snapshot(path))]
+    for name, loader in loaders:
+        loader() # warm the OS file cache
+        start = time.perf_counter()
+        for _ in range(repeat):
+            loader()
+        elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+
+        tracemalloc.start()
+        questions = loader()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>9}: {len(questions)} questions, {elapsed_ms:.2f} ms/load, "
+              f"retained {retained / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile question sheets into binary snapshots.")
+    parser.add_argument("sheets", nargs="*", default=["data/450DSA.json"])
+    parser.add_argument("--benchmark", action="store_true", help="compare snapshot vs raw JSON loading")
+    args = parser.parse_args()
+
+    for sheet in args.sheets:
+        if args.benchmark:
+            benchmark(sheet)
+        else:
+            questions = compile_snapshot(sheet)
+            print(f"Compiled {len(questions)} questions from {sheet} -> {snapshot_path_for(sheet)}")
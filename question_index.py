@@ -0,0 +1,132 @@
+import random
+from collections import OrderedDict
+
+def normalize_topic(text):
+    """Normalizes a topic name or filter for matching: lowercase, no spaces."""
+    return str(text).lower().replace(" ", "")
+
+class _IdPool:
+    """Array of ids with O(1) add, remove (swap with last) and random choice."""
+
+    __slots__ = ("_items", "_pos")
+
+    def __init__(self):
+        self._items = []
+        self._pos = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._pos
+
+    def add(self, item):
+        if item not in self._pos:
+            self._pos[item] = len(self._items)
+            self._items.append(item)
+
+    def remove(self, item):
+        index = self._pos.pop(item, None)
+        if index is None:
+            return
+        last = self._items.pop()
+        if index < len(self._items):
+            self._items[index] = last
+            self._pos[last] = index
+
+    def choice(self, rng=random):
+        return self._items[rng.randrange(len(self._items))]
+
+    def pick(self, offset):
+        return self._items[offset]
+
+class QuestionIndex:
+    """
+    In-memory index over a question bank, built once per load.
+    Questions are grouped into buckets by (normalized topic, difficulty), each
+    bucket keeping a pool of unposted ids, so picking and marking are O(1) in
+    the size of the bank and topic filters only scan the distinct topics.
+    A reload builds a new index, so cached filter results never outlive the bank.
+    """
+
+    FILTER_CACHE_SIZE = 256 # distinct (normalized filter, difficulty) pairs kept
+
+    def __init__(self, questions, posted_ids=()):
+        self.questions = questions
+        self.by_id = {}
+        self.topics = {} # normalized topic -> display topic
+        self._bucket_of = {} # id -> bucket key
+        self._buckets = {} # (normalized topic, difficulty) -> _IdPool of unposted ids
+        self._unposted = _IdPool()
+        self._filter_cache = OrderedDict() # (normalized filter, difficulty) -> matching bucket keys, LRU order
+
+        posted_ids = set(posted_ids)
+        for q in questions:
+            q_id = q["id"]
+            topic_norm = normalize_topic(q["topic"])
+            key = (topic_norm, q["difficulty"].lower())
+            self.by_id[q_id] = q
+            self.topics.setdefault(topic_norm, q["topic"])
+            self._bucket_of[q_id] = key
+            bucket = self._buckets.setdefault(key, _IdPool())
+            if q_id not in posted_ids:
+                bucket.add(q_id)
+                self._unposted.add(q_id)
+
+    @property
+    def total(self):
+        return len(self.questions)
+
+    @property
+    def remaining(self):
+        return len(self._unposted)
+
+    def _matching_buckets(self, topic_filter, difficulty):
+        filter_norm = normalize_topic(topic_filter) if topic_filter else None
+        difficulty_norm = difficulty.lower() if difficulty else None
+        cache_key = (filter_norm, difficulty_norm)
+        keys = self._filter_cache.get(cache_key)
+        if keys is not None:
+            self._filter_cache.move_to_end(cache_key)
+            return keys
+        keys = [
+            key for key in self._buckets
+            if (filter_norm is None or filter_norm in key[0])
+            and (difficulty_norm is None or key[1] == difficulty_norm)
+        ]
+        self._filter_cache[cache_key] = keys
+        if len(self._filter_cache) > self.FILTER_CACHE_SIZE:
+            self._filter_cache.popitem(last=False)
+        return keys
+
+    def matches_topic(self, topic_filter):
+        """True if any topic in the bank matches the filter (posted or not)."""
+        filter_norm = normalize_topic(topic_filter)
+        return any(filter_norm in topic_norm for topic_norm in self.topics)
+
+    def random_unposted(self, topic_filter=None, difficulty=None, rng=random):
+        """Returns a random unposted question matching the filters, or None."""
+        if not topic_filter and not difficulty:
+            return self.by_id[self._unposted.choice(rng)] if self._unposted else None
+
+        pools = [self._buckets[key] for key in self._matching_buckets(topic_filter, difficulty)]
+        available = sum(len(pool) for pool in pools)
+        if not available:
+            return None
+
+        # Weighted by pool size, so every matching question is equally likely
+        offset = rng.randrange(available)
+        for pool in pools:
+            if offset < len(pool):
+                return self.by_id[pool.pick(offset)]
+            offset -= len(pool)
+
+    def mark_posted(self, question_id):
+        """Removes a question from the unposted pools."""
+        key = self._bucket_of.get(question_id)
+        if key is not None:
+            self._buckets[key].remove(question_id)
+        self._unposted.remove(question_id)
+
+    def is_posted(self, question_id):
+        return question_id in self.by_id and question_id not in self._unposted
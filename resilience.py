@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+class CircuitBreaker:
+    """
+    Tracks a rolling window of outcomes and latencies for one upstream.
+
+    closed    -> calls go through; opens when the error rate over the window
+                 reaches FAILURE_RATE (with at least MIN_REQUESTS samples).
+    open      -> calls fail fast with CircuitOpenError for OPEN_SECONDS.
+    half_open -> a single probe call is let through; success closes the
+                 circuit, failure opens it again.
+
+    Idempotent reads can be hedged: if the first attempt is slower than the
+    recent p95 latency, a second one is sent and the first success wins.
+    """
+
+    WINDOW_SECONDS = 60
+    MIN_REQUESTS = 5
+    FAILURE_RATE = 0.5
+    OPEN_SECONDS = 30
+    DEFAULT_HEDGE_DELAY = 3.0 # seconds, used until there are enough latency samples
+    MIN_HEDGE_SAMPLES = 20
+
+    def __init__(self, name):
+        self.name = name
+        self.state = "closed"
+        self._window = deque() # (timestamp, ok, latency)
+        self._opened_at = 0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.hedges = 0
+
+    def _trim(self, now):
+        while self._window and self._window[0][0] < now - self.WINDOW_SECONDS:
+            self._window.popleft()
+
+    def allow(self):
+        """Returns True if a call may go to the upstream now."""
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.OPEN_SECONDS:
+                return False
+            self.state = "half_open"
+            logging.info(f"Circuit {self.name}: half-open, probing upstream.")
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record(self, ok, latency):
+        now = time.monotonic()
+        if self.state == "half_open":
+            self._probe_in_flight = False
+            if ok:
+                self.state = "closed"
+                self._window.clear()
+                logging.info(f"Circuit {self.name}: closed, upstream recovered.")
+            else:
+                self._open(now)
+            return
+
+        self._window.append((now, ok, latency))
+        self._trim(now)
+        if self.state == "closed" and len(self._window) >= self.MIN_REQUESTS:
+            failures = sum(1 for _, sample_ok, _ in self._window if not sample_ok)
+            if failures / len(self._window) >= self.FAILURE_RATE:
+                self._open(now)
+
+    def _open(self, now):
+        self.state = "open"
+        self._opened_at = now
+        logging.warning(f"Circuit {self.name}: open, failing fast for {self.OPEN_SECONDS}s.")
+
+    def stats(self):
+        self._trim(time.monotonic())
+        latencies = sorted(latency for _, ok, latency in self._window if ok)
+        failures = sum(1 for _, ok, _ in self._window if not ok)
+        return {
+            "state": self.state,
+            "requests": len(self._window),
+            "error_rate": failures / len(self._window) if self._window else 0.0,
+            "p50": latencies[len(latencies) // 2] if latencies else None,
+            "p95": self._percentile(latencies, 0.95),
+            "rejected": self.rejected,
+            "hedges": self.hedges
+        }
+
+    @staticmethod
+    def _percentile(sorted_values, fraction):
+        if not sorted_values:
+            return None
+        return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+    def hedge_delay(self):
+        """Seconds to wait before sending a hedged second request (the recent p95)."""
+        latencies = sorted(latency for _, ok, latency in self._window if ok)
+        if len(latencies) < self.MIN_HEDGE_SAMPLES:
+            return self.DEFAULT_HEDGE_DELAY
+        return self._percentile(latencies, 0.95)
+
+    async def call(self, fn, hedge=False):
+        """
+        Runs `fn()` (a coroutine function) through the breaker.
+        Exceptions from `fn` count as failures and are re-raised.
+        """
+        if not self.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+        start = time.monotonic()
+        try:
+            result = await (self._hedged(fn) if hedge else fn())
+        except asyncio.CancelledError:
+            # Not the upstream's fault; just free the half-open probe slot
+            if self.state == "half_open":
+                self._probe_in_flight = False
+            raise
+        except Exception:
+            self.record(False, time.monotonic() - start)
+            raise
+        self.record(True, time.monotonic() - start)
+        return result
+
+    async def _hedged(self, fn):
+        pending = {asyncio.ensure_future(fn())}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_delay())
+            if done:
+                return done.pop().result()
+
+            self.hedges += 1
+            pending.add(asyncio.ensure_future(fn()))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+_breakers = {}
+
+def breaker_for(name):
+    """Returns the shared CircuitBreaker for an upstream, creating it on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+def all_breakers():
+    return dict(_breakers)
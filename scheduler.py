@@ -1,28 +1,121 @@
 import asyncio
-from datetime import datetime, time, timezone, timedelta
+import discord
+import random
+from datetime import datetime, timezone, timedelta
 from discord.ext import tasks, commands
 import logging
+import sqlite3
+import time
 
-# IST is UTC+5:30
-IST = timezone(timedelta(hours=5, minutes=30))
+from metrics import registry as metrics
+from shared_state import shard_for
+from subscriptions import parse_timezone, parse_post_time
 
 class DailyScheduler(commands.Cog):
-    def __init__(self, bot, channel_id, post_callback):
+    """
+    Delivers the daily post to every subscribed channel.
+    Subscriptions are grouped into buckets by (timezone, local time); each
+    minute the due buckets are delivered concurrently with bounded parallelism.
+    Content for shared sources (the LeetCode daily) is built once per tick,
+    while per-guild sources (Striver) are built against that guild's history.
+    Posts are pre-rendered during a warm-up window before each slot, so at the
+    slot the bot only has to send them; a post only counts as used (e.g. the
+    Striver question is marked as posted) once it has actually been sent.
+    In a sharded run each process only schedules the guilds on its own shards,
+    and every post is claimed in the shared store before it is sent, so exactly
+    one process delivers it even while shards move between processes.
+    """
+
+    GRACE = timedelta(minutes=30) # a slot missed by a restart is still posted within this window
+    WARMUP = timedelta(minutes=5) # posts are fetched and rendered this long before their slot
+    MAX_PARALLEL = 10 # concurrent channel deliveries
+    MAX_RETRIES = 3
+    SHARED_SOURCES = ("leetcode",)
+    FALLBACK_SOURCE = "striver" # used when the subscribed source is still unavailable at the slot
+
+    def __init__(self, bot, subscriptions, build_post, shared=None, on_sent=None):
         self.bot = bot
-        self.channel_id = channel_id
-        self.post_callback = post_callback
+        self.subscriptions = subscriptions
+        self.build_post = build_post # async (source, guild_id) -> (embed, error_text, post info dict)
+        self.shared = shared # SharedState, or None when this is the only process
+        self.on_sent = on_sent # (post info, guild_id) -> None, called after a successful send
+        self._buckets = {} # (timezone, "HH:MM") -> [subscription dicts]
+        self._buckets_version = None
+        self._delivering = set() # channel ids with a delivery in progress
+        self._prepared = {} # channel id -> (local date, slot in UTC, pre-rendered embed, post info)
         self.daily_task.start()
 
     def cog_unload(self):
         self.daily_task.cancel()
 
-    @tasks.loop(time=time(hour=8, minute=0, tzinfo=IST)) 
-    # Sets the time to 8:00 AM IST. 
-    # explicit tzinfo ensures internal conversion to UTC happens correctly.
+    def owns(self, guild_id):
+        """True if this process runs the shard that the guild (or DMs, for None) lives on."""
+        shard_count = self.bot.shard_count
+        if not shard_count:
+            return True
+        shard_ids = getattr(self.bot, "shard_ids", None) or range(shard_count)
+        return shard_for(guild_id, shard_count) in shard_ids
+
+    def _refresh_buckets(self):
+        if self._buckets_version == self.subscriptions.version:
+            return
+        buckets = {}
+        for sub in self.subscriptions.all():
+            if not self.owns(sub["guild_id"]):
+                continue
+            buckets.setdefault((sub["timezone"], sub["post_time"]), []).append(sub)
+        self._buckets = buckets
+        self._buckets_version = self.subscriptions.version
+        logging.info("Scheduler: %d subscriptions in %d time buckets.", sum(len(s) for s in buckets.values()), len(buckets))
+
+    def _open_slots(self, now, before, after):
+        """Yields (subscription, local_date, slot) for slots in [slot - before, slot + after) that weren't sent today."""
+        self._refresh_buckets()
+        for (tz_name, post_time), subs in self._buckets.items():
+            try:
+                tz = parse_timezone(tz_name)
+            except ValueError as e:
+                logging.error("Scheduler: skipping bucket %s %s: %s", tz_name, post_time, e)
+                continue
+            local_now = now.astimezone(tz)
+            hour, minute = parse_post_time(post_time)
+            slot = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if not slot - before <= local_now < slot + after:
+                continue
+            local_date = local_now.date().isoformat()
+            for sub in subs:
+                if sub["last_posted"] != local_date and sub["channel_id"] not in self._delivering:
+                    yield sub, local_date, slot
+
+    def due_subscriptions(self, now):
+        """Returns [(subscription, local_date)] whose slot has passed today and which weren't sent yet."""
+        return [(sub, local_date) for sub, local_date, _ in self._open_slots(now, timedelta(0), self.GRACE)]
+
+    def upcoming_subscriptions(self, now):
+        """Returns [(subscription, local_date, slot)] whose slot starts within WARMUP and isn't prepared yet."""
+        return [
+            (sub, local_date, slot) for sub, local_date, slot in self._open_slots(now, self.WARMUP, timedelta(0))
+            if self._prepared.get(sub["channel_id"], (None,))[0] != local_date
+        ]
+
+    def _evict_prepared(self, now):
+        """Drops pre-rendered posts whose slot has passed (unsubscribed, moved or already delivered)."""
+        for channel_id in [cid for cid, (_, slot, _, _) in self._prepared.items() if slot <= now]:
+            del self._prepared[channel_id]
+
+    @tasks.loop(minutes=1)
     async def daily_task(self):
-        """Task that runs daily at the specified time."""
-        logging.info("Scheduler Triggered: executing daily post.")
-        await self.run_post()
+        """Every minute: pre-render posts for upcoming slots, then deliver the due ones."""
+        now = datetime.now(timezone.utc)
+        upcoming = self.upcoming_subscriptions(now)
+        if upcoming:
+            await self.warm_up(upcoming)
+
+        due = self.due_subscriptions(now)
+        if due:
+            logging.info("Scheduler Triggered: delivering daily post to %d channels.", len(due))
+            await self.deliver(due)
+        self._evict_prepared(now)
 
     @daily_task.before_loop
     async def before_daily_task(self):
@@ -30,15 +123,149 @@ class DailyScheduler(commands.Cog):
         await self.bot.wait_until_ready()
         logging.info("Scheduler: Bot is ready, task loop started.")
 
-    async def run_post(self):
-        """Orchestrates the posting logic."""
-        channel = self.bot.get_channel(self.channel_id)
-        if not channel:
-            logging.error(f"Scheduler: Channel {self.channel_id} not found.")
-            return
+    def _builder(self):
+        """
+        Returns a build function that builds shared sources only once per call site.
+        A shared build that failed or produced no post is forgotten, so a retry fetches again.
+        """
+        shared = {} # source -> task building the shared post
+
+        async def build(source, guild_id):
+            if source not in self.SHARED_SOURCES:
+                return await self.build_post(source, guild_id)
+            task = shared.get(source)
+            if task is None:
+                task = shared[source] = asyncio.ensure_future(self.build_post(source, None))
+            try:
+                result = await task
+            except Exception:
+                if shared.get(source) is task:
+                    del shared[source]
+                raise
+            if not result[0] and shared.get(source) is task:
+                del shared[source]
+            return result
+        return build
+
+    async def warm_up(self, upcoming):
+        """
+        Fetches and renders posts ahead of their slot. Only successful renders are
+        kept; failures are retried on the next tick and again at send time.
+        """
+        build = self._builder()
+
+        async def prepare(sub, local_date, slot):
+            try:
+                embed, error, post = await build(sub["source"], sub["guild_id"])
+            except Exception as e:
+                logging.warning("Scheduler: warm-up for %s failed: %s", sub['channel_id'], e)
+                return False
+            if not embed:
+                logging.warning("Scheduler: warm-up for %s got no content: %s", sub['channel_id'], error)
+                return False
+            self._prepared[sub["channel_id"]] = (local_date, slot, embed, post)
+            return True
+
+        prepared = await asyncio.gather(*(prepare(*entry) for entry in upcoming))
+        logging.info("Scheduler: pre-rendered %d/%d upcoming posts.", sum(prepared), len(upcoming))
+
+    @staticmethod
+    def _backoff(attempt, base=1.0, cap=30.0):
+        """Exponential backoff with full jitter around the nominal delay."""
+        return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def _build_with_fallback(self, build, sub):
+        """Builds a post, retrying with backoff and falling back to a Striver problem."""
+        error = None
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                embed, error, post = await build(sub["source"], sub["guild_id"])
+                if embed:
+                    return embed, None, post
+            except Exception as e:
+                error = str(e)
+            logging.warning("Scheduler: no content for %s (attempt %d): %s", sub['channel_id'], attempt + 1, error)
+            await asyncio.sleep(self._backoff(attempt))
+
+        if sub["source"] != self.FALLBACK_SOURCE:
+            logging.warning("Scheduler: falling back to %s for %s.", self.FALLBACK_SOURCE, sub['channel_id'])
+            return await self.build_post(self.FALLBACK_SOURCE, sub["guild_id"])
+        return None, error, None
+
+    @staticmethod
+    def _is_current(post, now):
+        """False for a pre-rendered LeetCode post whose challenge is no longer today's (UTC)."""
+        return not post or "date" not in post or post["date"] == now.date().isoformat()
+
+    async def deliver(self, due):
+        """Fans the post out to all due subscriptions, using pre-rendered posts when available."""
+        build = self._builder()
+        semaphore = asyncio.Semaphore(self.MAX_PARALLEL)
+
+        async def deliver_one(sub, local_date):
+            channel_id = sub["channel_id"]
+            self._delivering.add(channel_id)
+            outcome = "error"
+            claim = None
+            try:
+                async with semaphore:
+                    start = time.perf_counter()
+                    channel = self.bot.get_channel(channel_id)
+                    if not channel:
+                        logging.error("Scheduler: Channel %s not found.", channel_id)
+                        outcome = "missing_channel"
+                        return
+                    if self.shared is not None:
+                        if not self.shared.claim(f"post:{channel_id}:{local_date}"):
+                            logging.info("Scheduler: %s already got its %s post from another shard.", channel_id, local_date)
+                            sub["last_posted"] = local_date
+                            outcome = "claimed_elsewhere"
+                            return
+                        claim = f"post:{channel_id}:{local_date}" # released again if the post fails
+                    prepared_date, _, embed, post = self._prepared.pop(channel_id, (None, None, None, None))
+                    error = None
+                    prepared = prepared_date == local_date and self._is_current(post, datetime.now(timezone.utc))
+                    if not prepared:
+                        embed, error, post = await self._build_with_fallback(build, sub)
+                    if await self.run_post(channel, embed, error):
+                        self.subscriptions.mark_sent(channel_id, local_date)
+                        sub["last_posted"] = local_date
+                        if post and self.on_sent:
+                            self.on_sent(post, sub["guild_id"])
+                        outcome = "sent_prepared" if prepared else "sent"
+                    else:
+                        outcome = "failed"
+                    metrics.observe("dsabot_scheduled_post_seconds", time.perf_counter() - start)
+            except Exception as e:
+                logging.error("Scheduler: Error during daily post to %s: %s", channel_id, e)
+            finally:
+                if claim is not None and outcome in ("failed", "error"):
+                    try:
+                        self.shared.unclaim(claim) # let the next tick retry it
+                    except sqlite3.Error as e:
+                        logging.error("Scheduler: could not release the claim on %s: %s", channel_id, e)
+                self._delivering.discard(channel_id)
+                metrics.inc("dsabot_scheduled_posts_total", outcome=outcome)
 
-        try:
-           await self.post_callback(channel)
-        except Exception as e:
-            logging.error(f"Scheduler: Error during daily post execution: {e}")
+        await asyncio.gather(*(deliver_one(sub, local_date) for sub, local_date in due))
 
+    async def run_post(self, channel, embed, error=None):
+        """Sends one post, retrying rate limits and server errors with jittered backoff. Returns True on success."""
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                if embed:
+                    await channel.send(embed=embed)
+                else:
+                    await channel.send(error)
+                return True
+            except (discord.Forbidden, discord.NotFound) as e:
+                logging.error("Scheduler: cannot post to %s: %s", channel.id, e)
+                return False
+            except discord.HTTPException as e:
+                if attempt == self.MAX_RETRIES or not (e.status == 429 or e.status >= 500):
+                    logging.error("Scheduler: giving up on %s: %s", channel.id, e)
+                    return False
+                delay = getattr(e, "retry_after", None) or self._backoff(attempt)
+                logging.warning("Scheduler: post to %s failed (%s), retrying in %.1fs.", channel.id, e.status, delay)
+                await asyncio.sleep(delay)
+        return False
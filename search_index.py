@@ -0,0 +1,119 @@
+import heapq
+import re
+from array import array
+from collections import Counter
+from itertools import chain
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+CAMEL_RE = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+def tokenize(text):
+    """Lowercase alphanumeric words; camelCase is split ("LinkedList" -> linked, list)."""
+    return WORD_RE.findall(CAMEL_RE.sub(" ", str(text)).lower())
+
+def trigrams(text, joined=True):
+    """
+    Padded trigrams of each word, plus (if `joined`) of all words run together,
+    so both "linked lst" and "linkedlst" share most trigrams with "Linked List".
+    """
+    words = tokenize(text)
+    if joined and len(words) > 1:
+        words.append("".join(words))
+    grams = set()
+    for word in words:
+        padded = f"${word}$"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def acronym(text):
+    """Initials of a multi-word name ("Dynamic Programming" -> "dp"), else None."""
+    words = tokenize(text)
+    return "".join(word[0] for word in words) if len(words) > 1 else None
+
+class TrigramIndex:
+    """
+    Inverted index from trigram to the entries containing it.
+    A query only touches the posting lists of its own trigrams, which are
+    counted in one C-level pass (Counter over the chained arrays); entries are
+    ranked by the share of the query's trigrams they contain, then by overall
+    similarity (Dice). Trigrams found in a large share of all entries ("the",
+    "ing") say little about a match and dominate the cost on big banks, so they
+    are skipped whenever the query has enough rarer ones.
+    """
+
+    COMMON_FRACTION = 0.05 # trigrams in more than this share of entries count as common
+    MIN_RARE_GRAMS = 4
+
+    def __init__(self, entries, joined=True):
+        self.joined = joined
+        self.keys = []
+        self._sizes = array("I")
+        postings = {} # trigram -> sorted entry positions
+        for key, text in entries:
+            grams = trigrams(text, joined)
+            position = len(self.keys)
+            self.keys.append(key)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = [position]
+                else:
+                    posting.append(position)
+        self._postings = {gram: array("I", posting) for gram, posting in postings.items()}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, query, limit=5, min_score=0.3):
+        """Returns up to `limit` (score, key) pairs, best first; score is in [0, 1]."""
+        grams = trigrams(query, self.joined)
+        if not grams:
+            return []
+        postings = [self._postings.get(gram, ()) for gram in grams]
+        common = max(self.COMMON_FRACTION * len(self.keys), 32)
+        rare = [posting for posting in postings if len(posting) <= common]
+        if len(rare) >= self.MIN_RARE_GRAMS:
+            postings = rare
+        wanted = len(postings)
+        shared = Counter(chain.from_iterable(postings))
+
+        # More shared trigrams first; among equal counts the shorter entry has the higher Dice score
+        sizes = self._sizes
+        best = heapq.nlargest(limit, shared.items(), key=lambda item: (item[1], -sizes[item[0]]))
+        return [
+            (round(count / wanted, 3), self.keys[position]) for position, count in best
+            if count / wanted >= min_score
+        ]
+
+class QuestionSearch:
+    """Fuzzy lookup over a question bank: titles for !search, topic names for !topic."""
+
+    TOPIC_MIN_SCORE = 0.5 # to substitute a topic filter outright
+    SUGGEST_MIN_SCORE = 0.2 # to merely suggest it
+
+    def __init__(self, questions):
+        self.by_id = {q["id"]: q for q in questions}
+        self.topics = {} # display topic -> None, in first-seen order
+        for q in questions:
+            self.topics.setdefault(q["topic"], None)
+        # Titles skip the run-together trigrams: long titles would double their postings
+        self._titles = TrigramIndex(((q["id"], q["title"]) for q in questions), joined=False)
+        self._topics = TrigramIndex((topic, topic) for topic in self.topics)
+        self._acronyms = {}
+        for topic in self.topics:
+            short = acronym(topic)
+            if short:
+                self._acronyms.setdefault(short, topic)
+
+    def match_topics(self, text, limit=3, min_score=None):
+        """Closest topic names for a possibly misspelled or abbreviated filter, best first."""
+        short = "".join(tokenize(text))
+        if short in self._acronyms:
+            return [self._acronyms[short]]
+        min_score = self.TOPIC_MIN_SCORE if min_score is None else min_score
+        return [topic for _, topic in self._topics.search(text, limit, min_score)]
+
+    def search(self, text, limit=5):
+        """Top `limit` questions whose title best matches `text`, as (score, question) pairs."""
+        return [(score, self.by_id[q_id]) for score, q_id in self._titles.search(text, limit)]
@@ -0,0 +1,121 @@
+import json
+import os
+import sqlite3
+import time
+
+def shard_for(guild_id, shard_count):
+    """The shard Discord routes a guild to; DMs (no guild) always go to shard 0."""
+    return (guild_id >> 22) % shard_count if guild_id else 0
+
+def parse_shard_ids(text, shard_count):
+    """Parses "0-3" or "0,2,5" into a sorted list of shard ids. Raises ValueError on bad input."""
+    ids = set()
+    for part in text.split(","):
+        start, _, end = part.strip().partition("-")
+        ids.update(range(int(start), int(end or start) + 1))
+    if not ids or min(ids) < 0 or max(ids) >= shard_count:
+        raise ValueError(f"Shard ids {text!r} must lie in 0-{shard_count - 1}")
+    return sorted(ids)
+
+class SharedState:
+    """
+    State shared by every bot process on a host, in one SQLite file (WAL mode,
+    so readers never block the writer):
+
+    - kv:     JSON values with an expiry, e.g. the LeetCode daily challenge
+              fetched by whichever shard got there first.
+    - leases: short-lived named locks with an owner, so only one process runs
+              a given job (refreshing the daily cache, syncing the catalog).
+    - claims: permanent "this was done" markers; inserting one is atomic, so
+              exactly one process wins e.g. a scheduled post for a given day.
+    """
+
+    CLAIM_RETENTION = 7 * 24 * 60 * 60 # seconds claims are kept before pruning
+
+    def __init__(self, path, owner):
+        self.path = path
+        self.owner = owner # identifies this process in leases and claims, e.g. "shards-0-3"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS kv (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS claims (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                claimed_at REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+        self._prune()
+
+    def _prune(self):
+        now = time.time()
+        with self._conn:
+            self._conn.execute("DELETE FROM kv WHERE expires_at < ?", (now,))
+            self._conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            self._conn.execute("DELETE FROM claims WHERE claimed_at < ?", (now - self.CLAIM_RETENTION,))
+
+    def get(self, key):
+        """Returns (value, expires_at) for an unexpired key, or (None, 0)."""
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM kv WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, 0)
+
+    def set(self, key, value, expires_at):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+
+    def acquire_lease(self, name, ttl):
+        """
+        Takes (or renews) the named lease for `ttl` seconds. Returns True if this
+        process holds it, False while another live process does.
+        """
+        now = time.time()
+        with self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE leases.owner = excluded.owner OR leases.expires_at < ?
+                """,
+                (name, self.owner, now + ttl, now)
+            )
+        return cursor.rowcount == 1
+
+    def release_lease(self, name):
+        with self._conn:
+            self._conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner))
+
+    def claim(self, key):
+        """Records `key` as done by this process. Returns False if any process already claimed it."""
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO claims (key, owner, claimed_at) VALUES (?, ?, ?)",
+                (key, self.owner, time.time())
+            )
+        return cursor.rowcount == 1
+
+    def unclaim(self, key):
+        """Gives a claim back (e.g. the post failed), so it can be retried."""
+        with self._conn:
+            self._conn.execute("DELETE FROM claims WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def close(self):
+        self._conn.close()
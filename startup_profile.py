@@ -0,0 +1,66 @@
+import logging
+import time
+from contextlib import contextmanager
+
+class StartupProfiler:
+    """
+    Wall-clock cost of each cold-start phase, measured from the moment bot.py
+    started executing (interpreter startup itself is not included).
+    `mark(name)` closes a top-level phase (imports, setup, login, gateway,
+    data); `step(name)` times one piece inside the current phase, such as a
+    single service load.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget # seconds; the report warns when the total goes over
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = [] # (name, seconds)
+        self.steps = [] # (phase the step belongs to, name, seconds)
+
+    def mark(self, name):
+        """Attributes the time since the previous mark to phase `name`."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((len(self.phases), name, time.perf_counter() - start))
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def over_budget(self):
+        return self.budget is not None and self.total > self.budget
+
+    def report(self):
+        """Multi-line summary: each phase with its steps, then the total against the budget."""
+        lines = ["Startup profile:"]
+        for index, (phase, seconds) in enumerate(self.phases):
+            lines.append(f"  {phase:<10} {seconds * 1000:8.1f} ms")
+            for _, step, step_seconds in (s for s in self.steps if s[0] == index):
+                lines.append(f"    {step:<22} {step_seconds * 1000:8.1f} ms")
+        budget = f" (budget {self.budget:g}s)" if self.budget is not None else ""
+        lines.append(f"  {'total':<10} {self.total * 1000:8.1f} ms{budget}")
+        return "\n".join(lines)
+
+    def log_report(self, verbose):
+        """Logs the full report if `verbose`, else one line; warns when over budget."""
+        if verbose:
+            logging.info(self.report())
+        else:
+            logging.info(f"Startup: ready in {self.total:.2f}s "
+                         f"({', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.phases)}).")
+        if self.over_budget():
+            logging.warning(f"Startup: {self.total:.2f}s exceeds the {self.budget:g}s budget.")
+
+    def samples(self):
+        """Gauge samples for the metrics registry."""
+        for phase, seconds in self.phases:
+            yield "dsabot_startup_seconds", {"phase": phase}, round(seconds, 4)
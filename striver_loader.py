@@ -1,143 +1,275 @@
+import asyncio
 import json
-import random
 import os
 from datetime import datetime
 import logging # Added logging import
 
+from posted_store import PostedStore
+from question_bank import load_questions
+from question_index import QuestionIndex
+from search_index import QuestionSearch
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+def remap_posted(posted_ids, old_by_link, new_by_link):
+    """
+    Carries posted ids across a sheet reload by URL, since ids are row positions.
+    Returns (ids to add, ids to remove) for the store.
+    """
+    posted_links = {link for link, q in old_by_link.items() if q.id in posted_ids}
+    old_ids = {q.id for q in old_by_link.values()}
+    add_ids, remove_ids = set(), set()
+    for link, q in new_by_link.items():
+        if link in posted_links:
+            if q.id not in posted_ids:
+                add_ids.add(q.id)
+        elif q.id in posted_ids and q.id in old_ids:
+            remove_ids.add(q.id) # the id now belongs to a different, unposted question
+    return add_ids, remove_ids
+
+class PostedHistory:
+    """One shard of posted state: its store, the posted id set and an index over the bank."""
+
+    def __init__(self, store, questions):
+        self.store = store
+        self.posted_ids = store.load_posted("striver")
+        self.index = QuestionIndex(questions, self.posted_ids)
+
+    def sync(self):
+        """Reloads the posted ids if another bot process (a sharded run) wrote to the store."""
+        if self.store.changed_externally():
+            self.posted_ids = self.store.load_posted("striver")
+            self.index = QuestionIndex(self.index.questions, self.posted_ids)
+
+    def mark_posted(self, question_id):
+        if question_id not in self.posted_ids:
+            self.posted_ids.add(question_id)
+            self.index.mark_posted(question_id)
+            self.store.add_posted(question_id, "striver")
+
+    def remap(self, old_by_link, new_by_link):
+        """
+        Carries posted history across a sheet reload (see remap_posted).
+        Returns the posted id set to use with the new bank; the store is updated in one transaction.
+        """
+        add_ids, remove_ids = remap_posted(self.posted_ids, old_by_link, new_by_link)
+        self.store.update_posted(add=add_ids, remove=remove_ids, source="striver")
+        return (self.posted_ids - remove_ids) | add_ids
+
 class StriverLoader:
     QUESTION_FILE = "data/450DSA.json"
-    POSTED_FILE = "data/posted_questions.json"
+    EXTRA_QUESTION_FILES = [] # further sheets; their ids are prefixed with the file name
+    POSTED_FILE = "data/posted_questions.json" # legacy format, migrated into POSTED_DB
+    POSTED_DB = "data/posted_questions.db"
+    GUILD_DB_DIR = "data/guilds" # one posted-history database per guild
 
-    def __init__(self):
+    def __init__(self, difficulty_for=None):
+        # Optional link -> difficulty lookup (the LeetCode catalog); sheets only say "Medium"
+        self.difficulty_for = difficulty_for
+        self._sheets = {} # path -> (mtime_ns, questions)
         self.questions = self.load_questions()
-        self.posted_questions = self.load_posted_state()
+        self.search = QuestionSearch(self.questions)
+        self.home_guild_id = None # guild that shares the legacy global history
+        self._histories = {None: PostedHistory(PostedStore(self.POSTED_DB, legacy_json=self.POSTED_FILE), self.questions)}
+
+    @property
+    def index(self):
+        """Index of the global (non-guild) history."""
+        return self._histories[None].index
+
+    def history_for(self, guild_id=None):
+        """
+        Returns the posted-history shard for a guild, opening it on first use.
+        Each guild has its own SQLite file, so writes for one guild never wait on another's.
+        """
+        if guild_id == self.home_guild_id:
+            guild_id = None
+        history = self._histories.get(guild_id)
+        if history is None:
+            store = PostedStore(os.path.join(self.GUILD_DB_DIR, f"{guild_id}.db"))
+            history = self._histories[guild_id] = PostedHistory(store, self.questions)
+        return history
+
+    @property
+    def question_files(self):
+        return [self.QUESTION_FILE] + list(self.EXTRA_QUESTION_FILES)
+
+    def _id_prefix(self, path):
+        if path == self.QUESTION_FILE:
+            return "" # the main sheet keeps plain numeric ids
+        return os.path.splitext(os.path.basename(path))[0] + ":"
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_sheet(self, path):
+        """
+        Loads one sheet, via its compiled snapshot when fresh. Returns (mtime_ns, questions).
+        Raises json.JSONDecodeError for a sheet that doesn't parse (e.g. saved mid-edit).
+        """
+        mtime = self._mtime(path)
+        if mtime is None:
+            logging.error(f"File not found: {path}")
+            return None, []
+
+        questions = load_questions(path)
+
+        prefix = self._id_prefix(path)
+        if prefix:
+            for q in questions:
+                q.id = prefix + q.id
+        if self.difficulty_for:
+            for q in questions:
+                q.difficulty = self.difficulty_for(q.link) or q.difficulty
+        return mtime, questions
 
     def load_questions(self):
-        """Loads questions from the local JSON file with the 450DSA schema."""
-        if not os.path.exists(self.QUESTION_FILE):
-            logging.error(f"File not found: {self.QUESTION_FILE}")
-            return []
-        
+        """Loads every configured sheet and returns the combined question list."""
+        self._sheets = {}
+        for path in self.question_files:
+            try:
+                self._sheets[path] = self._load_sheet(path)
+            except json.JSONDecodeError as e:
+                # No mtime is recorded, so the watcher retries the sheet once it parses
+                logging.error(f"Error parsing JSON in {path}: {e}")
+                self._sheets[path] = (None, [])
+        questions = [q for _, sheet in self._sheets.values() for q in sheet]
+
+        logging.info(f"Loaded {len(questions)} questions from {len(self._sheets)} sheet(s).")
+        # The topic list is only built when DEBUG logging is on
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Topics: {sorted(set(q.topic for q in questions))}")
+        return questions
+
+    def changed_sheets(self):
+        """Returns the sheets whose file changed since they were loaded."""
+        return [
+            path for path in self.question_files
+            if path not in self._sheets or self._mtime(path) != self._sheets[path][0]
+        ]
+
+    async def reload(self, force=False):
+        """
+        Reparses changed sheets (all sheets if `force`) and swaps them in.
+        Parsing runs in a worker thread; the swap itself never awaits, so commands
+        always see either the old bank or the new one. Returns a summary dict, or
+        None if nothing changed.
+        Raises json.JSONDecodeError if a sheet doesn't parse; nothing is swapped
+        in then and the sheet keeps its old mtime, so the next check retries it.
+        """
+        paths = self.question_files if force else self.changed_sheets()
+        if not paths:
+            return None
+
+        loaded = {}
+        for path in paths:
+            loaded[path] = await asyncio.to_thread(self._load_sheet, path)
+        return self._swap_sheets(loaded)
+
+    def _swap_sheets(self, loaded):
+        old_by_link = {q.link: q for path in loaded for q in self._sheets.get(path, (None, []))[1]}
+        new_by_link = {q.link: q for _, sheet in loaded.values() for q in sheet}
+
+        sheets = dict(self._sheets)
+        sheets.update(loaded)
+        questions = [q for path in self.question_files for q in sheets.get(path, (None, []))[1]]
+        search = QuestionSearch(questions)
+        rebuilt = []
+        for history in self._histories.values():
+            posted_ids = history.remap(old_by_link, new_by_link)
+            rebuilt.append((history, posted_ids, QuestionIndex(questions, posted_ids)))
+        self._remap_closed_guilds(old_by_link, new_by_link)
+
+        # Swap everything in one step
+        self._sheets, self.questions, self.search = sheets, questions, search
+        for history, posted_ids, index in rebuilt:
+            history.posted_ids, history.index = posted_ids, index
+
+        def fields(q):
+            return (q.title, q.topic, q.difficulty)
+
+        summary = {
+            "sheets": list(loaded),
+            "total": len(questions),
+            "added": sum(1 for link in new_by_link if link not in old_by_link),
+            "removed": sum(1 for link in old_by_link if link not in new_by_link),
+            "changed": sum(
+                1 for link, q in new_by_link.items()
+                if link in old_by_link and fields(q) != fields(old_by_link[link])
+            )
+        }
+        logging.info(f"Question bank reloaded: {summary}")
+        return summary
+
+    def _remap_closed_guilds(self, old_by_link, new_by_link):
+        """
+        Remaps the guild stores under GUILD_DB_DIR that aren't open yet, so a guild
+        first used after a reload doesn't load ids from the previous row order.
+        """
         try:
-            # Fix: Use 'utf-8-sig' to handle files with BOM (Byte Order Mark)
-            with open(self.QUESTION_FILE, 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
-                
-            # Dictionary key is "Sheet1"
-            raw_questions = data.get("Sheet1", [])
-            
-            cleaned_questions = []
-            for i, q in enumerate(raw_questions):
-                # Dynamic Key Discovery
-                # Use the first key that looks like "Topic", "Problem", "URL"
-                title_key = next((k for k in q.keys() if "Problem" in k), "Problem")
-                topic_key = next((k for k in q.keys() if "Topic" in k), "Topic")
-                link_key = next((k for k in q.keys() if "URL" in k or "Link" in k), "URL")
-
-                title = q.get(title_key, "Unknown Problem").strip()
-                topic = q.get(topic_key, "General").strip()
-                link = q.get(link_key, "").strip()
-                
-                # Filter out empty or placeholder URLs if needed
-                if not link or link == "<->":
-                    continue
-
-                cleaned_questions.append({
-                    "id": str(i + 1), 
-                    "title": title,
-                    "difficulty": "Medium", # Default difficulty
-                    "topic": topic,
-                    "link": link,
-                    "platform": "DSA Sheet"
-                })
-            
-            unique_topics = set(q['topic'] for q in cleaned_questions)
-            logging.info(f"Loaded {len(cleaned_questions)} questions. Unique Topics Found: {sorted(list(unique_topics))}")
-            return cleaned_questions
-            
-        except json.JSONDecodeError as e:
-            logging.error(f"Error parsing JSON: {e}")
-            return []
-
-    def load_posted_state(self):
-        """Loads the history of posted questions."""
-        if not os.path.exists(self.POSTED_FILE):
-            return {"striver": [], "leetcode_daily_last_posted": None}
-        
-        with open(self.POSTED_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-
-    def _save_posted_state(self):
-        """Saves the current history to file."""
-        with open(self.POSTED_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.posted_questions, f, indent=4)
-
-    def get_random_question(self, topic_filter=None, difficulty=None):
+            names = os.listdir(self.GUILD_DB_DIR)
+        except FileNotFoundError:
+            return
+        for name in names:
+            guild_id, ext = os.path.splitext(name)
+            if ext != ".db" or not guild_id.isdigit() or int(guild_id) in self._histories:
+                continue
+            store = PostedStore(os.path.join(self.GUILD_DB_DIR, name))
+            try:
+                add_ids, remove_ids = remap_posted(store.load_posted("striver"), old_by_link, new_by_link)
+                store.update_posted(add=add_ids, remove=remove_ids, source="striver")
+            finally:
+                store.close()
+
+    def get_random_question(self, topic_filter=None, difficulty=None, guild_id=None):
         """
-        Selects a random question that hasn't been posted yet.
-        Optionally filters by topic or difficulty.
+        Selects a random question that hasn't been posted yet (in this guild's history).
+        Optionally filters by topic (normalized substring match) or difficulty.
         """
-        # Fix: Use self.posted_questions instead of self.history
-        posted_ids = set(self.posted_questions.get("striver", []))
-        
-        # DEBUG: Print stats
-        logging.info(f"DEBUG: Total Questions: {len(self.questions)}, Posted IDs: {len(posted_ids)}")
-        
-        candidates = []
-        for q in self.questions:
-            # Apply difficulty filter
-            if difficulty:
-                if q["difficulty"].lower() != difficulty.lower():
-                    continue
-
-            # Apply topic filter
-            if topic_filter:
-                # Robust match: normalize by removing spaces and lowercasing
-                filter_norm = topic_filter.lower().replace(" ", "")
-                topic_norm = str(q["topic"]).lower().replace(" ", "")
-                
-                # Check 1: simple substring in the normalized string
-                if filter_norm in topic_norm:
-                    # DEBUG regex match verification
-                    # logging.info(f"Match found! Filter: {filter_lower} in Topic: {topic_str_lower}")
-                    pass # Match found
-                else:
-                    # logging.info(f"No match: Filter: {filter_lower} not in Topic: {topic_str_lower}")
-                    continue # No match
-
-            if str(q["id"]) not in posted_ids:
-                candidates.append(q)
-        
-        if not candidates:
+        history = self.history_for(guild_id)
+        history.sync()
+        index = history.index
+        logging.debug(f"Total Questions: {index.total}, Unposted: {index.remaining}")
+
+        if topic_filter and not index.matches_topic(topic_filter):
+            # Typo or abbreviation ("linkedlst", "dp"): use the closest topic instead
+            closest = self.search.match_topics(topic_filter, limit=1)
+            if closest:
+                topic_filter = closest[0]
+
+        selected = index.random_unposted(topic_filter=topic_filter, difficulty=difficulty)
+        if selected is None:
             # If all posted, reset or just return None
             logging.info("All questions (in this filter) have been posted!")
-            return None
-            
-        selected = random.choice(candidates)
         return selected
 
-    def mark_as_posted(self, question_id):
-        """Marks a question ID as posted and saves to file."""
-        if "striver" not in self.posted_questions:
-            self.posted_questions["striver"] = []
-            
-        # Ensure we store strings to match JSON format consistency
-        q_id_str = str(question_id)
-        if q_id_str not in self.posted_questions["striver"]:
-            self.posted_questions["striver"].append(q_id_str)
-            self._save_posted_state() # Fix: Call the correctly named save method
-    
-    def get_question_stats(self):
+    def suggest_topics(self, text, limit=3):
+        """Closest topic names to `text`, for "did you mean" replies."""
+        return self.search.match_topics(text, limit, min_score=self.search.SUGGEST_MIN_SCORE)
+
+    def search_questions(self, text, limit=5):
+        """Top `limit` questions by fuzzy title match, as (score, question) pairs."""
+        return self.search.search(text, limit)
+
+    def mark_as_posted(self, question_id, guild_id=None):
+        """Marks a question ID as posted in this guild's history and records it in its store."""
+        # Ensure we store strings to match the id format
+        self.history_for(guild_id).mark_posted(str(question_id))
+
+    def get_question_stats(self, guild_id=None):
         """Returns stats about questions pool."""
-        total = len(self.questions)
-        posted = len(self.posted_questions.get("striver", []))
+        index = self.history_for(guild_id).index
+        total = index.total
+        remaining = index.remaining
         return {
             "total": total,
-            "posted": posted,
-            "remaining": total - posted
+            "posted": total - remaining,
+            "remaining": remaining
         }
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from collections import deque
+
+class SubmissionRejected(Exception):
+    """Raised when a submission cannot be accepted right now (queue full or user busy)."""
+
+class SubmissionJob:
+    """
+    A single queued !submit run. Await `result` for the CodeRunner result dict.
+    `run`, if given, is an async callable executed instead of a plain CodeRunner call
+    (e.g. a whole !judge batch), so it shares the same workers and limits.
+    """
+
+    def __init__(self, user_id, language, code, stdin="", run=None):
+        self.user_id = user_id
+        self.language = language
+        self.code = code
+        self.stdin = stdin
+        self.run = run
+        self.state = "queued" # queued -> running -> done
+        self.position = 0 # 1-based place in line when accepted, 0 if it starts immediately
+        self.started = asyncio.Event()
+        self.result = asyncio.get_running_loop().create_future()
+
+class SubmissionQueue:
+    """
+    Bounded scheduler in front of CodeRunner.
+    A fixed pool of workers pulls jobs round-robin across users, so one user
+    pasting many snippets cannot starve everyone else, and each user has a cap
+    on outstanding (queued + running) jobs.
+    """
+
+    def __init__(self, runner, workers=3, max_queue=50, max_per_user=2):
+        self.runner = runner
+        self.worker_count = workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+
+        self._pending = {} # user_id -> deque of queued jobs
+        self._rotation = deque() # user ids with queued jobs, in round-robin order
+        self._queued = 0
+        self._outstanding = {} # user_id -> queued + running jobs
+        self._idle = 0
+        self._cond = None
+        self._workers = []
+        self._wakeups = set() # pending notify tasks; the loop only keeps weak references to tasks
+
+    def start(self):
+        """Spawns the worker tasks. Must be called from a running event loop."""
+        if self._workers:
+            return
+        self._cond = asyncio.Condition()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logging.info(f"SubmissionQueue: started {self.worker_count} workers (queue size {self.max_queue}).")
+
+    async def close(self):
+        """Stops the workers and fails any jobs still waiting in the queue."""
+        for task in self._workers + list(self._wakeups):
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._wakeups, return_exceptions=True)
+        self._workers = []
+
+        for jobs in self._pending.values():
+            for job in jobs:
+                if not job.result.done():
+                    job.result.set_result({"error": "Bot is shutting down."})
+        self._pending.clear()
+        self._rotation.clear()
+        self._queued = 0
+        self._outstanding.clear()
+
+    @property
+    def depth(self):
+        """Number of jobs waiting for a worker."""
+        return self._queued
+
+    def submit(self, user_id, language, code, stdin="", run=None):
+        """
+        Enqueues a run and returns its SubmissionJob without waiting.
+        Raises SubmissionRejected immediately instead of letting the caller time out.
+        """
+        if not self._workers:
+            raise SubmissionRejected("Code runner is not ready yet, try again in a moment.")
+        if self._outstanding.get(user_id, 0) >= self.max_per_user:
+            raise SubmissionRejected(f"You already have {self.max_per_user} submissions in flight, wait for them to finish.")
+        if self._queued >= self.max_queue:
+            raise SubmissionRejected("The code runner is busy right now, please try again shortly.")
+
+        job = SubmissionJob(user_id, language, code, stdin, run)
+        user_jobs = self._pending.get(user_id)
+        if user_jobs is None:
+            user_jobs = self._pending[user_id] = deque()
+            self._rotation.append(user_id)
+        user_jobs.append(job)
+        self._queued += 1
+        self._outstanding[user_id] = self._outstanding.get(user_id, 0) + 1
+
+        ahead = self._jobs_ahead(user_id, len(user_jobs) - 1)
+        job.position = 0 if ahead < self._idle else ahead - self._idle + 1
+
+        self._wake_worker()
+        return job
+
+    def _jobs_ahead(self, user_id, index):
+        """Counts jobs that round-robin order will run before the `index`-th job of `user_id`."""
+        ahead = index
+        before_user = True
+        for other in self._rotation:
+            if other == user_id:
+                before_user = False
+                continue
+            # Users earlier in the rotation get one extra turn before ours in each round
+            ahead += min(len(self._pending[other]), index + (1 if before_user else 0))
+        return ahead
+
+    def _wake_worker(self):
+        # Condition.notify needs the lock, which can only be awaited, so it runs as a task
+        async def notify():
+            async with self._cond:
+                self._cond.notify()
+        task = asyncio.create_task(notify())
+        self._wakeups.add(task)
+        task.add_done_callback(self._wakeup_done)
+
+    def _wakeup_done(self, task):
+        self._wakeups.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"SubmissionQueue: worker wakeup failed: {task.exception()}")
+
+    def _pop_next(self):
+        """Takes the next job in round-robin order. Caller guarantees the queue is not empty."""
+        user_id = self._rotation.popleft()
+        user_jobs = self._pending[user_id]
+        job = user_jobs.popleft()
+        if user_jobs:
+            self._rotation.append(user_id)
+        else:
+            del self._pending[user_id]
+        self._queued -= 1
+        return job
+
+    async def _worker(self, worker_id):
+        while True:
+            async with self._cond:
+                self._idle += 1
+                try:
+                    await self._cond.wait_for(lambda: self._queued > 0)
+                finally:
+                    self._idle -= 1
+                job = self._pop_next()
+
+            job.state = "running"
+            job.started.set()
+            try:
+                if job.run is not None:
+                    result = await job.run()
+                else:
+                    result = await self.runner.execute_code_async(job.language, job.code, job.stdin)
+            except asyncio.CancelledError:
+                if not job.result.done():
+                    job.result.set_result({"error": "Bot is shutting down."})
+                raise
+            except Exception as e:
+                logging.error(f"SubmissionQueue: worker {worker_id} failed on job: {e}")
+                result = {"error": "Unexpected error while running your code."}
+            finally:
+                remaining = self._outstanding.get(job.user_id, 1) - 1
+                if remaining:
+                    self._outstanding[job.user_id] = remaining
+                else:
+                    self._outstanding.pop(job.user_id, None)
+
+            job.state = "done"
+            if not job.result.done():
+                job.result.set_result(result)
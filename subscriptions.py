@@ -0,0 +1,132 @@
+import os
+import re
+import sqlite3
+from datetime import timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+OFFSET_PATTERN = re.compile(r"^(?:UTC)?([+-])(\d{1,2}):?(\d{2})$", re.IGNORECASE)
+TIME_PATTERN = re.compile(r"^(\d{1,2}):(\d{2})$")
+SOURCES = ("leetcode", "striver", "auto")
+
+def parse_timezone(name):
+    """Accepts an IANA name ("Asia/Kolkata") or a fixed offset ("+05:30", "UTC-4:00")."""
+    if name.upper() in ("UTC", "Z"):
+        return timezone.utc
+    match = OFFSET_PATTERN.match(name)
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = timedelta(hours=int(hours), minutes=int(minutes))
+        return timezone(-offset if sign == "-" else offset)
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}") from None
+
+def parse_post_time(text):
+    """Parses "HH:MM" (24h) into (hour, minute)."""
+    match = TIME_PATTERN.match(text)
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError(f"Invalid time (expected HH:MM): {text}")
+    return int(match.group(1)), int(match.group(2))
+
+class SubscriptionStore:
+    """
+    Channels subscribed to the scheduled daily post, one row per channel, in SQLite.
+    `version` increases on every change so the scheduler knows when to regroup.
+    """
+
+    HOME_SEEDED = "home_channel_seeded" # meta flag: the CHANNEL_ID subscription was created once
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        existed = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'subscriptions'"
+        ).fetchone() is not None
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        if existed:
+            # Databases from before the flag were seeded on their first start already
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, '1')", (self.HOME_SEEDED,))
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS subscriptions (
+                channel_id INTEGER PRIMARY KEY,
+                guild_id INTEGER,
+                post_time TEXT NOT NULL,
+                timezone TEXT NOT NULL,
+                source TEXT NOT NULL,
+                last_posted TEXT
+            )
+        """)
+        self._conn.commit()
+        self.version = 0
+
+    def all(self):
+        return [dict(row) for row in self._conn.execute("SELECT * FROM subscriptions")]
+
+    def get(self, channel_id):
+        row = self._conn.execute("SELECT * FROM subscriptions WHERE channel_id = ?", (channel_id,)).fetchone()
+        return dict(row) if row else None
+
+    def upsert(self, channel_id, guild_id, post_time="08:00", tz="+05:30", source="leetcode"):
+        """Adds or updates a channel's subscription. Raises ValueError on bad input."""
+        hour, minute = parse_post_time(post_time)
+        parse_timezone(tz)
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source: {source} (expected one of {', '.join(SOURCES)})")
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO subscriptions (channel_id, guild_id, post_time, timezone, source)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(channel_id) DO UPDATE SET
+                    guild_id = excluded.guild_id, post_time = excluded.post_time,
+                    timezone = excluded.timezone, source = excluded.source
+                """,
+                (channel_id, guild_id, f"{hour:02d}:{minute:02d}", tz, source)
+            )
+        self.version += 1
+
+    def seed_home(self, channel_id, guild_id, post_time="08:00", tz="+05:30", source="leetcode"):
+        """
+        Subscribes the home channel the first time this database is used, and never again,
+        so an !unsubscribe there sticks across restarts. Returns True if it was added.
+        """
+        with self._conn:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (self.HOME_SEEDED,)).fetchone():
+                return False
+            self._conn.execute("INSERT INTO meta (key, value) VALUES (?, '1')", (self.HOME_SEEDED,))
+            cursor = self._conn.execute(
+                """
+                INSERT OR IGNORE INTO subscriptions (channel_id, guild_id, post_time, timezone, source)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (channel_id, guild_id, post_time, tz, source)
+            )
+        self.version += 1
+        return cursor.rowcount == 1
+
+    def remove(self, channel_id):
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM subscriptions WHERE channel_id = ?", (channel_id,))
+        self.version += 1
+        return cursor.rowcount == 1
+
+    def mark_sent(self, channel_id, local_date):
+        """Records the local date of the last delivered post, so restarts don't double-post."""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE subscriptions SET last_posted = ? WHERE channel_id = ?",
+                (local_date, channel_id)
+            )
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import sys
+
+from code_runner import CodeRunner
+from judge import Judge
+
+class SubprocessRunner:
+    """Runs Python locally in a subprocess, standing in for CodeRunner."""
+
+    LANG_MAP = {}
+
+    async def execute_code_async(self, language, code, stdin="", cache=True):
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", code,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate(stdin.encode())
+        return {"stdout": stdout.decode(), "stderr": stderr.decode(), "code": proc.returncode}
+
+def judge_with(tmp_path, cases):
+    cases_file = tmp_path / "testcases.json"
+    cases_file.write_text(json.dumps({"sum": {"cases": cases}}))
+    return Judge(SubprocessRunner(), cases_file=str(cases_file))
+
+CASES = [{"input": "1 2\n", "output": "3"}, {"input": "3 4\n", "output": "7"}]
+
+def test_batched_cases_read_stdin_buffer(tmp_path):
+    code = "import sys\nprint(sum(map(int, sys.stdin.buffer.read().split())))"
+    verdict = asyncio.run(judge_with(tmp_path, CASES).run("sum", "python", code))
+    assert verdict["mode"] == "batched"
+    assert [case["passed"] for case in verdict["cases"]] == [True, True], verdict
+
+def test_batched_cases_read_fd_zero(tmp_path):
+    code = "print(sum(map(int, open(0).read().split())))"
+    verdict = asyncio.run(judge_with(tmp_path, CASES).run("sum", "python", code))
+    assert [case["passed"] for case in verdict["cases"]] == [True, True], verdict
+
+def test_batched_case_time_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(Judge, "CASE_TIMEOUT", 0.5)
+    code = "a, b = map(int, input().split())\nwhile a == 1: pass\nprint(a + b)"
+    verdict = asyncio.run(judge_with(tmp_path, CASES).run("sum", "python", code))
+    first, second = verdict["cases"]
+    assert not first["passed"] and "Time limit exceeded" in first["error"]
+    assert second["passed"]
+
+def test_batched_runs_skip_the_result_cache(tmp_path):
+    class Backend:
+        async def resolve(self, language):
+            return language, "*"
+
+        async def execute(self, lang, code, stdin="", version="*"):
+            return await SubprocessRunner().execute_code_async(lang, code, stdin)
+
+    runner = CodeRunner(Backend())
+    cases_file = tmp_path / "testcases.json"
+    cases_file.write_text(json.dumps({"sum": {"cases": CASES}}))
+    verdict = asyncio.run(Judge(runner, cases_file=str(cases_file)).run("sum", "python", "print(sum(map(int, input().split())))"))
+    assert [case["passed"] for case in verdict["cases"]] == [True, True]
+    assert runner.cache.stats()["entries"] == 0
@@ -0,0 +1,20 @@
+from output_pager import OutputPager
+
+def rendered_size(text):
+    return len(OutputPager.code_block(text))
+
+def test_fits_inline_counts_fences():
+    overhead = rendered_size("")
+    at_limit = "x" * (OutputPager.FIELD_CHARS - overhead)
+    assert rendered_size(at_limit) == OutputPager.FIELD_CHARS
+    assert OutputPager.fits_inline(at_limit, "")
+    assert not OutputPager.fits_inline(at_limit + "x", "")
+    assert not OutputPager.fits_inline("", at_limit + "x")
+
+def test_fits_inline_counts_escaped_fences():
+    # Every ``` in the output grows by one character when escaped
+    text = "```" * 200
+    text += "x" * (OutputPager.FIELD_CHARS - rendered_size(text))
+    assert rendered_size(text) == OutputPager.FIELD_CHARS
+    assert OutputPager.fits_inline(text, "")
+    assert not OutputPager.fits_inline(text + "x", "")
@@ -0,0 +1,74 @@
+import asyncio
+
+from scheduler import DailyScheduler
+
+class Channel:
+    id = 1
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, embed=None):
+        self.sent.append(embed or content)
+
+class Bot:
+    shard_count = None
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def get_channel(self, channel_id):
+        return self.channel
+
+    async def wait_until_ready(self):
+        await asyncio.Event().wait() # the minute loop never starts in these tests
+
+class Subscriptions:
+    version = 0
+
+    def mark_sent(self, channel_id, local_date):
+        pass
+
+def deliver(monkeypatch, build_post, channel, due):
+    """Runs one delivery round on a scheduler whose backoff doesn't sleep."""
+    monkeypatch.setattr(DailyScheduler, "_backoff", staticmethod(lambda attempt, **kwargs: 0))
+
+    async def run():
+        scheduler = DailyScheduler(Bot(channel), Subscriptions(), build_post)
+        try:
+            await scheduler.deliver(due)
+        finally:
+            scheduler.cog_unload()
+    asyncio.run(run())
+
+def test_shared_source_is_refetched_on_every_retry(monkeypatch):
+    calls = []
+
+    async def build_post(source, guild_id):
+        calls.append(source)
+        if source == "leetcode":
+            return None, "LeetCode is down", None
+        return "striver post", None, {"source": "striver", "id": "1"}
+
+    channel = Channel()
+    sub = {"channel_id": 1, "guild_id": 10, "source": "leetcode", "last_posted": None}
+    deliver(monkeypatch, build_post, channel, [(sub, "2026-10-18")])
+
+    assert calls.count("leetcode") == DailyScheduler.MAX_RETRIES
+    assert channel.sent == ["striver post"] # fell back after the retries
+
+def test_shared_source_failure_raised_is_refetched(monkeypatch):
+    calls = []
+
+    async def build_post(source, guild_id):
+        calls.append(source)
+        if len(calls) == 1:
+            raise RuntimeError("timeout")
+        return "leetcode post", None, {"source": "leetcode", "date": "2026-10-18"}
+
+    channel = Channel()
+    sub = {"channel_id": 1, "guild_id": 10, "source": "leetcode", "last_posted": None}
+    deliver(monkeypatch, build_post, channel, [(sub, "2026-10-18")])
+
+    assert calls == ["leetcode", "leetcode"]
+    assert channel.sent == ["leetcode post"]
@@ -0,0 +1,28 @@
+import asyncio
+import json
+import os
+
+from striver_loader import StriverLoader
+
+def write_sheet(links, mtime_ns):
+    rows = [{"Topic": "Array", "Problem": link, "URL": f"https://example.com/{link}"} for link in links]
+    with open(StriverLoader.QUESTION_FILE, "w", encoding="utf-8") as f:
+        json.dump({"Sheet1": rows}, f)
+    os.utime(StriverLoader.QUESTION_FILE, ns=(mtime_ns, mtime_ns)) # explicit, so the edit is always noticed
+
+def test_reload_remaps_guild_history_that_is_not_open(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    write_sheet(["a", "b", "c"], 1)
+    loader = StriverLoader()
+    loader.mark_as_posted("2", guild_id=5) # "b"
+
+    # Restart: guild 5's store exists on disk but isn't opened before the sheet changes
+    loader = StriverLoader()
+    write_sheet(["x", "a", "b", "c"], 2)
+    asyncio.run(loader.reload())
+
+    history = loader.history_for(5)
+    posted = {history.index.by_id[q_id]["link"] for q_id in history.posted_ids}
+    assert posted == {"https://example.com/b"}
+    assert history.index.remaining == 3